@@ -1,3 +1,38 @@
 __author__ = 'jeffrey.starr@ztoztechnologies.com'
 
-from infer import infer
+from .cache import CacheInfo, FormatCache
+from .columns import ColumnResult, infer_columns
+from .date_elements import TIMEZONE_SOURCES, NameTable, name_table, refresh_names, set_timezone_source, timezone_names
+from .files import infer_file, infer_mmap
+from .infer import FormatCandidate, FormatShare, infer, infer_all, infer_candidates, tokenize_many
+from .inferrer import LENGTH_POLICIES, Inferrer
+from .locales import LOCALE_NAMES, locale_names, register_locale
+from .locate import TimestampSpan, locate_and_infer
+from .parsing import CompiledParser, ValidationResult, compile_parser, validate
+from .sampling import SampleResult, infer_sample
+from .state import InferenceState
+from .stats import InferenceStats
+from .streaming import StreamingInferrer
+
+import importlib
+
+# asyncio and the HTTP server are slow to import and only needed by some users, so their modules are imported on first
+# use of these names
+_LAZY = {
+    'AsyncInferrer': 'asynchronous',
+    'infer_async': 'asynchronous',
+    'Batcher': 'server',
+    'make_server': 'server',
+}
+
+
+def __getattr__(name):
+    if name not in _LAZY:
+        raise AttributeError('module {0!r} has no attribute {1!r}'.format(__name__, name))
+    value = getattr(importlib.import_module('.' + _LAZY[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY))
@@ -0,0 +1,89 @@
+import asyncio
+import weakref
+from .infer import _locale_tables, infer
+
+
+class AsyncInferrer(object):
+    """
+    Infers date formats from asyncio code without blocking the event loop.
+
+    The inference runs in executor (the loop's default executor if None). Requests for the same examples as an
+    inference still in progress wait for its result instead of starting another, so a burst of requests for the same
+    column costs a single inference. Requests are compared by their examples, which only costs hashing them: any key
+    that tells apart the examples of different formats needs them tokenized, which is most of the inference.
+
+    At most max_concurrency steps are submitted to the executor at once; further requests wait for a free slot,
+    which bounds the work queued behind a burst. An AsyncInferrer must be used from a single event loop.
+    """
+
+    def __init__(self, executor=None, max_concurrency=8, alt_rules=None, locale=None):
+        """
+        alt_rules and locale are used as in infer.infer. With a process pool as executor, the examples and their
+        tokens are sent to the worker processes.
+        """
+        if max_concurrency < 1:
+            raise ValueError('max_concurrency must be at least 1')
+        self.executor = executor
+        self.max_concurrency = max_concurrency
+        self.alt_rules = alt_rules
+        self.locale = locale
+        self.computed = 0  # inferences run
+        self.coalesced = 0  # requests answered by an inference started for another request
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._in_flight = {}  # tuple of examples -> Task inferring their format
+        _locale_tables(locale)  # raise ValueError now for an unknown locale
+
+    async def infer(self, examples):
+        """
+        Return the format infer.infer would return for examples
+        """
+        loop = asyncio.get_running_loop()
+        # bytearray and memoryview examples are not hashable
+        key = tuple([example if isinstance(example, (str, bytes)) else bytes(example) for example in examples])
+
+        task = self._in_flight.get(key)
+        if task is None:
+            task = loop.create_task(self._infer(key))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+            self.computed += 1
+        else:
+            self.coalesced += 1
+        # shield: a cancelled request must not cancel the inference other requests are waiting for
+        return await asyncio.shield(task)
+
+    async def infer_many(self, columns):
+        """
+        Return the formats of every list of examples in columns, in order, inferred concurrently
+        """
+        return list(await asyncio.gather(*[self.infer(examples) for examples in columns]))
+
+    async def _infer(self, examples):
+        loop = asyncio.get_running_loop()
+        async with self._semaphore:
+            return await loop.run_in_executor(self.executor, _infer, examples, self.alt_rules, self.locale)
+
+
+_DEFAULT_INFERRERS = weakref.WeakKeyDictionary()  # event loop -> AsyncInferrer used by infer_async
+
+
+async def infer_async(examples, alt_rules=None, locale=None):
+    """
+    Return the format infer.infer would return for examples, computed in the event loop's default executor. Calls
+    from the same event loop with the same alt_rules and locale share an AsyncInferrer, so concurrent requests for
+    the same examples are coalesced.
+    """
+    loop = asyncio.get_running_loop()
+    inferrers = _DEFAULT_INFERRERS.setdefault(loop, {})
+    key = (id(alt_rules), locale)
+    inferrer = inferrers.get(key)
+    if inferrer is None or inferrer.alt_rules is not alt_rules:
+        inferrer = inferrers[key] = AsyncInferrer(alt_rules=alt_rules, locale=locale)
+    return await inferrer.infer(examples)
+
+
+def _infer(examples, alt_rules, locale):
+    """
+    Return the format of examples. Runs in the executor.
+    """
+    return infer(examples, alt_rules=alt_rules, locale=locale)
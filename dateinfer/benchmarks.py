@@ -0,0 +1,199 @@
+import argparse
+import gc
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import timeit
+import tracemalloc
+import yaml
+from .cache import FormatCache
+from .columns import infer_columns
+from .infer import DATE_ELEMENTS, RULES, _apply_rewrites, _percent_match, _tag_most_likely_tokenized, \
+    _tokenize_by_character_class, infer, tokenize_many
+
+
+STAGES = ('tokenize', 'tag', 'percent_match', 'rewrite', 'infer', 'cache_miss', 'cache_hit')
+DEFAULT_SIZES = (1000, 10000, 100000)
+
+_EXAMPLES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'examples.yaml')
+_LONG_LINE_TEXT = ' GET /index.html HTTP/1.1 200 "Mozilla/5.0 (X11; Linux x86_64)" ' * 8
+
+
+def load_cases(path=_EXAMPLES_PATH):
+    """
+    Return a list of (name, examples) for every example date format in the YAML file at path
+    """
+    with open(path, 'r') as f:
+        return [(document['name'], [str(example) for example in document['examples']])
+                for document in yaml.safe_load_all(f) if document]
+
+
+def scale(examples, rows):
+    """
+    Return a list of rows examples made by repeating examples
+    """
+    return list(itertools.islice(itertools.cycle(examples), rows))
+
+
+def long_lines(examples):
+    """
+    Return examples with several hundred characters of log text appended to each
+    """
+    return [example + _LONG_LINE_TEXT for example in examples]
+
+
+def run(sizes=DEFAULT_SIZES, cases=None, repeat=3, columns=100, memory=True):
+    """
+    Run the benchmarks and return the results as a JSON-serializable dict.
+
+    For every case of examples.yaml (or the given list of (name, examples)), every size in sizes and every stage in
+    STAGES, the best of repeat timings is recorded, along with the peak memory allocated by the stage (measured in a
+    separate run with tracemalloc if memory is True). A long-line case appends log text to the examples of the first
+    case, and a many-column case infers columns columns of size / columns rows each with infer_columns.
+    """
+    if cases is None:
+        cases = load_cases()
+
+    results = []
+    for rows in sizes:
+        for name, examples in cases:
+            results.extend(_stage_results(name, scale(examples, rows), repeat, memory))
+        if cases:
+            name, examples = cases[0]
+            results.extend(_stage_results('long lines: ' + name, long_lines(scale(examples, rows)), repeat, memory))
+
+            column_rows = max(rows // columns, 1)
+            data = [scale(cases[i % len(cases)][1], column_rows) for i in range(columns)]
+            seconds, peak = _measure(lambda: infer_columns(data, workers=1, sample_size=column_rows), repeat, memory)
+            results.append(_result('many columns: {0}'.format(columns), rows, 'infer_columns', seconds, peak))
+
+    return {
+        'commit': _commit(),
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'results': results,
+    }
+
+
+def compare(baseline, current, threshold=1.1):
+    """
+    Return a list of (case, rows, stage, ratio) for every result of current that is slower than the same result of
+    baseline (both as returned by run) by more than the factor threshold, slowest first.
+    """
+    before = dict(((r['case'], r['rows'], r['stage']), r['seconds']) for r in baseline['results'])
+    regressions = []
+    for r in current['results']:
+        key = (r['case'], r['rows'], r['stage'])
+        if before.get(key) and r['seconds'] / before[key] > threshold:
+            regressions.append(key + (r['seconds'] / before[key],))
+    return sorted(regressions, key=lambda regression: -regression[3])
+
+
+def _stage_results(name, examples, repeat, memory):
+    """
+    Return the results of every stage in STAGES for a single list of examples
+    """
+    tokenized = tokenize_many(examples)
+    lengths = [len(tokens) for tokens in tokenized]
+    mode_length = max(set(lengths), key=lengths.count)
+    positions = list(zip(*[tokens for tokens in tokenized if len(tokens) == mode_length]))
+    tagged = _tag_most_likely_tokenized(tokenized)
+    warm = FormatCache()
+    infer(examples, cache=warm)
+
+    stages = {
+        'tokenize': lambda: [_tokenize_by_character_class(example) for example in examples],
+        'tag': lambda: _tag_most_likely_tokenized(tokenized),
+        'percent_match': lambda: [_percent_match(DATE_ELEMENTS, list(tokens)) for tokens in positions],
+        'rewrite': lambda: _apply_rewrites(tagged, RULES),
+        'infer': lambda: infer(examples),
+        'cache_miss': lambda: infer(examples, cache=FormatCache()),
+        'cache_hit': lambda: infer(examples, cache=warm),
+    }
+
+    results = []
+    for stage in STAGES:
+        seconds, peak = _measure(stages[stage], repeat, memory)
+        results.append(_result(name, len(examples), stage, seconds, peak))
+    return results
+
+
+def _measure(function, repeat, memory):
+    """
+    Return the best of repeat timings of calling function and the peak bytes it allocated (None if not memory)
+    """
+    seconds = min(timeit.repeat(function, number=1, repeat=repeat))
+
+    peak = None
+    if memory:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            function()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return seconds, peak
+
+
+def _result(case, rows, stage, seconds, peak):
+    return {'case': case, 'rows': rows, 'stage': stage, 'seconds': seconds, 'peak_bytes': peak}
+
+
+def _commit():
+    """
+    Return the git commit of the working tree, or None if it is not known
+    """
+    try:
+        output = subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(_EXAMPLES_PATH),
+                                         stderr=subprocess.STDOUT)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return output.decode('ascii').strip()
+
+
+def main(argv=None):
+    """
+    Run the benchmarks from the command line and write the results as JSON. Returns the exit status, which is 1 if
+    --compare found a regression.
+    """
+    parser = argparse.ArgumentParser(description='Benchmark date format inference')
+    parser.add_argument('--sizes', default=','.join([str(size) for size in DEFAULT_SIZES]),
+                        help='comma-separated numbers of rows (default: %(default)s)')
+    parser.add_argument('--cases', help='only run the examples.yaml cases whose name contains this text')
+    parser.add_argument('--repeat', type=int, default=3, help='timings per stage; the best is kept')
+    parser.add_argument('--columns', type=int, default=100, help='number of columns of the many-column case')
+    parser.add_argument('--no-memory', dest='memory', action='store_false', help='do not measure peak memory')
+    parser.add_argument('-o', '--output', help='write the results to this file instead of standard output')
+    parser.add_argument('--compare', help='results file of a previous run to compare against')
+    parser.add_argument('--threshold', type=float, default=1.1,
+                        help='slowdown factor reported as a regression by --compare (default: %(default)s)')
+    args = parser.parse_args(argv)
+
+    cases = load_cases()
+    if args.cases:
+        cases = [case for case in cases if args.cases in case[0]]
+    results = run([int(size) for size in args.sizes.split(',')], cases, args.repeat, args.columns, args.memory)
+
+    text = json.dumps(results, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        sys.stdout.write(text + '\n')
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            regressions = compare(json.load(f), results, args.threshold)
+        for case, rows, stage, ratio in regressions:
+            sys.stderr.write('{0} ({1} rows) {2}: {3:.2f}x slower\n'.format(case, rows, stage, ratio))
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
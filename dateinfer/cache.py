@@ -0,0 +1,76 @@
+import collections
+import threading
+
+
+CacheInfo = collections.namedtuple('CacheInfo', ['hits', 'misses', 'evictions', 'maxsize', 'currsize'])
+
+
+class FormatCache(object):
+    """
+    A size-bounded, thread-safe LRU cache of inferred formats shared across calls to infer.infer(..., cache=...).
+
+    Entries are keyed by the rule set in use and the tuple of date elements the examples are tagged with (see
+    infer._tag_most_likely_tokenized). The format depends on nothing else, so a hit skips rule rewriting without
+    changing the result. Tagging is not skipped: any key that determines the format needs the examples tokenized
+    and counted per position, which is most of the work of tagging.
+    """
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = collections.OrderedDict()  # key -> (rules, format), least recently used first
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        """
+        Remove every entry and reset the counters
+        """
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def get(self, rules, elements):
+        """
+        Return the format cached for rules and elements, or None if there is none
+        """
+        key = _key(rules, elements)
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries[key] = entry  # now the most recently used
+            self.hits += 1
+            return entry[1]
+
+    def info(self):
+        """
+        Return a CacheInfo of the counters and sizes of the cache
+        """
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.evictions, self.maxsize, len(self._entries))
+
+    def put(self, rules, elements, date_string):
+        """
+        Cache date_string as the format for rules and elements
+        """
+        key = _key(rules, elements)
+        with self._lock:
+            self._entries.pop(key, None)
+            # The entry holds on to the rules so that their ids in the key cannot be reused by other objects
+            self._entries[key] = (tuple(rules), date_string)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+
+def _key(rules, elements):
+    """
+    Return the cache key for rules and elements. Rules are compared by identity.
+    """
+    return tuple([id(rule) for rule in rules]), elements
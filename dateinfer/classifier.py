@@ -0,0 +1,128 @@
+import collections
+import functools
+import re
+from .date_elements import DIGITS, LETTERS, name_table
+
+
+_ALL_DIGITS = re.compile(r'[0-9]+\Z')
+_ALL_LETTERS = re.compile(r'[a-zA-Z]+\Z')
+
+
+class TokenClassifier(object):
+    """
+    Matches tokens against an ordered sequence of date elements in a single step.
+
+    classify(token) returns a bitmask where bit i is set if date_elements[i] matches the token. The character class
+    of the token is decided once; an all-digit token is converted to an integer once and compared against the
+    value_range of every numeric element, and is_match is only called for the elements that could possibly match
+    a token of that class. Since a column of dates repeats a small number of distinct tokens, the bitmask of every
+    token seen is memoized (up to max_cache_size distinct tokens). The memoized bitmasks are discarded when the
+    month and weekday name tables change (see date_elements.refresh_names).
+
+    If names is a date_elements.NameTable, month and weekday names are matched against it instead of the name tables
+    used by the elements' is_match, e.g. to classify the tokens of another locale (see locales.locale_names).
+    """
+
+    def __init__(self, date_elements, max_cache_size=65536, names=None):
+        self.date_elements = tuple(date_elements)
+        self.max_cache_size = max_cache_size
+        self.names = names
+        self._cache = {}
+        self._name_table = None  # the name tables the memoized bitmasks were computed with
+
+        self._ranges = []  # (index, low, high, width) for elements decided by the integer value of a digit token
+        self._digit_checks = []  # (bit, is_match function) that must be called, by token character class
+        self._letter_checks = []
+        self._other_checks = []
+        for index, elem in enumerate(self.date_elements):
+            bit = 1 << index
+            is_match = elem.is_match
+            if names is not None and elem.directive in ('%B', '%b', '%A', '%a'):
+                is_match = functools.partial(names.contains, elem.directive)
+            if elem.character_class == DIGITS and elem.value_range is not None:
+                low, high = elem.value_range
+                self._ranges.append((index, low, high, elem.width))
+            elif elem.character_class != LETTERS:
+                self._digit_checks.append((bit, is_match))
+            if elem.character_class != DIGITS:
+                self._letter_checks.append((bit, is_match))
+            self._other_checks.append((bit, is_match))
+
+    def classify(self, token):
+        """
+        Return the bitmask of the date elements matching token
+        """
+        try:
+            return self._cache[token]
+        except KeyError:
+            pass
+
+        if not isinstance(token, str):  # a token of a bytes example, see infer.tokenize_many
+            mask = self.classify(token.decode('utf-8', 'replace'))
+            self._cache[token] = mask
+            return mask
+
+        mask = 0
+        if _ALL_DIGITS.match(token):
+            value = int(token)
+            width = len(token)
+            for index, low, high, required_width in self._ranges:
+                if low <= value <= high and (required_width is None or required_width == width):
+                    mask |= 1 << index
+            checks = self._digit_checks
+        elif _ALL_LETTERS.match(token):
+            checks = self._letter_checks
+        else:
+            checks = self._other_checks
+
+        for bit, is_match in checks:
+            if is_match(token):
+                mask |= bit
+
+        if len(self._cache) >= self.max_cache_size:
+            self._cache.clear()
+        self._cache[token] = mask
+        return mask
+
+    def count(self, tokens):
+        """
+        Return a list with, for each date element, the number of tokens in tokens that it matched
+        """
+        return self.count_masks(self.mask_counts(collections.Counter(tokens)))
+
+    def mask_counts(self, token_counts):
+        """
+        Given a mapping of token to number of occurrences, return a Counter of bitmask to number of occurrences
+        """
+        self.refresh()
+        masks = collections.Counter()
+        for token, n in token_counts.items():
+            masks[self.classify(token)] += n
+        return masks
+
+    def refresh(self):
+        """
+        Discard the memoized bitmasks if the name tables changed since they were computed. Called by mask_counts;
+        callers using classify directly should call it first.
+        """
+        if self.names is not None:  # fixed names
+            return
+        table = name_table()
+        if table is not self._name_table:
+            self._cache.clear()
+            self._name_table = table
+
+    def count_masks(self, mask_counts):
+        """
+        Given a mapping of bitmask to number of occurrences, return a list with, for each date element, the number
+        of occurrences of bitmasks that include the element
+        """
+        match_count = [0] * len(self.date_elements)
+        for mask, n in mask_counts.items():
+            index = 0
+            while mask:
+                if mask & 1:
+                    match_count[index] += n
+                mask >>= 1
+                index += 1
+        return match_count
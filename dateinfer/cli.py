@@ -0,0 +1,151 @@
+import argparse
+import io
+import itertools
+import sys
+import time
+from .files import infer_file
+from .streaming import StreamingInferrer
+
+
+def main(argv=None):
+    """
+    Command line interface. Returns the exit status.
+    """
+    parser = argparse.ArgumentParser(prog='dateinfer', description='Infer date formats from examples')
+    subparsers = parser.add_subparsers(dest='command')
+
+    file_parser = subparsers.add_parser('file', help='infer the date format of the columns of a CSV/TSV file')
+    file_parser.add_argument('path', help='path of the delimited text file')
+    file_parser.add_argument('-d', '--delimiter', help='field delimiter (default: tab for .tsv, comma otherwise)')
+    file_parser.add_argument('-c', '--columns',
+                             help='comma-separated column names (or indices with --no-header) to infer')
+    file_parser.add_argument('--no-header', dest='header', action='store_false',
+                             help='the first line is data, not column names')
+    file_parser.add_argument('--encoding', default='utf-8', help='text encoding of the file (default: utf-8)')
+
+    lines_parser = subparsers.add_parser('lines', help='infer the date format of lines read from files or stdin')
+    lines_parser.add_argument('paths', nargs='*', metavar='path', help='files to read (default: stdin; - is stdin)')
+    lines_parser.add_argument('-n', '--every', type=int,
+                              help='print the format of every window of this many lines, preceded by its line count')
+    lines_parser.add_argument('-t', '--interval', type=float,
+                              help='print the format of every window of this many seconds, preceded by its line count')
+    lines_parser.add_argument('--locale', help='language of month and weekday names, e.g. fr or de_DE')
+    lines_parser.add_argument('--encoding', default='utf-8', help='text encoding of the input (default: utf-8)')
+
+    serve_parser = subparsers.add_parser('serve', help='answer inference requests over HTTP (see server.py)')
+    serve_parser.add_argument('--host', default='127.0.0.1', help='address to listen on (default: %(default)s)')
+    serve_parser.add_argument('-p', '--port', type=int, default=8000, help='port to listen on (default: %(default)s)')
+    serve_parser.add_argument('-s', '--socket', help='listen on this Unix socket instead of host and port')
+    serve_parser.add_argument('--max-batch', type=int, default=64, help='most requests inferred in one batch')
+    serve_parser.add_argument('--max-delay', type=float, default=0.005,
+                              help='seconds to wait for more requests to batch with the first (default: %(default)s)')
+    serve_parser.add_argument('-v', '--verbose', action='store_true', help='log every request to stderr')
+
+    args = parser.parse_args(argv)
+    if args.command == 'lines' and args.every is not None and args.every < 1:
+        parser.error('--every must be at least 1')
+    if args.command == 'file':
+        return _file(args)
+    if args.command == 'lines':
+        try:
+            return _lines(args)
+        except BrokenPipeError:  # e.g. piped into head
+            sys.stderr.close()
+            return 0
+    if args.command == 'serve':
+        return _serve(args)
+    parser.print_usage(sys.stderr)
+    return 2
+
+
+def _file(args):
+    """
+    Run the file command: print a line of column and format for every column
+    """
+    columns = None
+    if args.columns:
+        columns = args.columns.split(',')
+        if not args.header:
+            columns = [int(column) for column in columns]
+
+    formats = infer_file(args.path, delimiter=args.delimiter, columns=columns, header=args.header,
+                         encoding=args.encoding)
+    for column, date_string in formats.items():
+        sys.stdout.write(u'{0}\t{1}\n'.format(column, date_string))
+    return 0
+
+
+def _lines(args):
+    """
+    Run the lines command: print the format of all lines read, or of every window of lines with --every or
+    --interval. Lines are read chunk by chunk into a StreamingInferrer, so memory does not grow with the input. A time
+    window ends at the first line read after its interval has passed.
+    """
+    streams = [_read_lines(path, args.encoding) for path in args.paths or ['-']]
+    lines = (line.rstrip('\r\n') for line in itertools.chain.from_iterable(streams))
+    lines = (line for line in lines if line)
+
+    windowed = args.every is not None or args.interval is not None
+    inferrer = StreamingInferrer(locale=args.locale)
+    chunk = []
+    window_start = time.monotonic()
+    for line in lines:
+        chunk.append(line)
+        window_full = args.every is not None and inferrer.examples_seen + len(chunk) >= args.every
+        window_over = args.interval is not None and time.monotonic() - window_start >= args.interval
+        if window_full or window_over or len(chunk) >= 1000:
+            inferrer.update_many(chunk)
+            chunk = []
+        if window_full or window_over:
+            _print_window(inferrer)
+            inferrer = StreamingInferrer(locale=args.locale)
+            window_start = time.monotonic()
+
+    inferrer.update_many(chunk)
+    if not windowed:
+        sys.stdout.write(u'{0}\n'.format(inferrer.infer()))
+    elif inferrer.examples_seen:
+        _print_window(inferrer)
+    return 0
+
+
+def _read_lines(path, encoding):
+    """
+    Yield the lines of the file at path, or of stdin if path is -. The file is opened when the first line is read.
+    """
+    if path == '-':
+        stdin = getattr(sys.stdin, 'buffer', None)
+        for line in sys.stdin if stdin is None else io.TextIOWrapper(stdin, encoding=encoding, errors='replace'):
+            yield line
+    else:
+        with io.open(path, 'r', encoding=encoding, errors='replace') as f:
+            for line in f:
+                yield line
+
+
+def _print_window(inferrer):
+    sys.stdout.write(u'{0}\t{1}\n'.format(inferrer.examples_seen, inferrer.infer()))
+    sys.stdout.flush()
+
+
+def _serve(args):
+    """
+    Run the serve command until interrupted
+    """
+    from .server import make_server  # the server modules are only imported when serving
+
+    server = make_server(args.host, args.port, args.socket, args.max_batch, args.max_delay, args.verbose)
+    where = args.socket or '{0}:{1}'.format(*server.server_address[:2])
+    sys.stderr.write('dateinfer: listening on {0}\n'.format(where))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.batcher.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,67 @@
+import collections
+import random
+import timeit
+from .infer import infer
+from .sampling import _reservoir
+
+
+ColumnResult = collections.namedtuple('ColumnResult', ['format', 'seconds', 'examined'])
+
+
+def infer_columns(columns, workers=None, sample_size=1000, alt_rules=None, seed=None):
+    """
+    Infer the date format of every column in columns, spreading the columns across a pool of worker processes.
+
+    columns is either a mapping of column name to examples, or an iterable of example lists. Each worker is sent a
+    uniform random sample of at most sample_size examples of a column. workers is the number of processes (the
+    number of CPUs if None); with workers=1 every column is inferred in the calling process.
+
+    Returns a ColumnResult of the format, the seconds spent inferring it and the number of examples examined for
+    every column: a dict with the same keys if columns is a mapping, otherwise a list in the same order.
+    """
+    rng = random.Random(seed)
+    if hasattr(columns, 'keys'):
+        names = list(columns.keys())
+        samples = [_sample(columns[name], sample_size, rng) for name in names]
+    else:
+        names = None
+        samples = [_sample(column, sample_size, rng) for column in columns]
+
+    tasks = [(sample, alt_rules) for sample in samples]
+    if workers == 1 or len(tasks) <= 1:
+        results = [_infer_column(task) for task in tasks]
+    else:
+        import multiprocessing  # slow to import, and only needed for a pool
+        pool = multiprocessing.Pool(workers)
+        try:
+            results = pool.map(_infer_column, tasks, chunksize=1)
+        finally:
+            pool.close()
+            pool.join()
+
+    if names is None:
+        return results
+    return dict(zip(names, results))
+
+
+def _infer_column(task):
+    """
+    Return the ColumnResult for a task of (examples, alt_rules). Runs in a worker process.
+    """
+    examples, alt_rules = task
+    start = timeit.default_timer()
+    date_string = infer(examples, alt_rules=alt_rules)
+    return ColumnResult(date_string, timeit.default_timer() - start, len(examples))
+
+
+def _sample(examples, sample_size, rng):
+    """
+    Return examples as a list if it has at most sample_size examples, otherwise a random sample of sample_size. The
+    sample of a sequence is drawn by index, without visiting every example.
+    """
+    if hasattr(examples, '__len__'):
+        if len(examples) <= sample_size:
+            return list(examples)
+        if hasattr(examples, '__getitem__'):
+            return [examples[index] for index in rng.sample(range(len(examples)), sample_size)]
+    return _reservoir(examples, sample_size, rng)
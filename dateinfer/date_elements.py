@@ -1,10 +1,33 @@
 import calendar
-import pytz
 import re
+import string
+import threading
 
 
 __author__ = 'jeffrey.starr@ztoztechnologies.com'
 
+# Character classes used to describe which tokens an element can possibly match. They mirror the character
+# classes used by the tokenizer, so a token produced by the tokenizer belongs to exactly one of them (or to none,
+# for unprintable or non-ASCII characters).
+DIGITS = string.digits
+LETTERS = string.ascii_letters
+
+# Date elements other than Filler are interned: there is a single instance of every element class. Filler is not,
+# since there is one per filler text and any text can become filler.
+_INTERNED = {}  # class -> element
+_INTERN_LOCK = threading.Lock()
+
+# The set of timezone names matched by Timezone is only loaded when a token first needs it (see timezone_names).
+TIMEZONE_SOURCES = ('pytz', 'zoneinfo')
+_TIMEZONE_SOURCE = None  # one of TIMEZONE_SOURCES, or None for pytz if it is installed and zoneinfo otherwise
+_TIMEZONE_NAMES = None
+_TIMEZONE_LOCK = threading.Lock()
+
+# Month and weekday names are matched against the NameTable returned by name_table, built from calendar on first
+# use and rebuilt by refresh_names.
+_NAME_TABLE = None
+_NAME_LOCK = threading.Lock()
+
 
 class DateElement(object):
     """
@@ -12,20 +35,38 @@ class DateElement(object):
 
     Inheriting classes should implement a string 'directive' field that provides the relevant
     directive for the datetime.strftime/strptime method.
+
+    Inheriting classes may also describe their domain so that tokens can be classified without calling is_match:
+    character_class (DIGITS or LETTERS) states that the element never matches a token made up entirely of the other
+    character class, or None if no such promise is made. For DIGITS elements, value_range is the inclusive
+    (low, high) range of the integer value of an all-digit token and width, if not None, is its required length.
     """
+    __slots__ = ()
+
     directive = None
+    character_class = None
+    value_range = None
+    width = None
+
+    def __new__(cls):
+        return _intern(cls)
 
     def __eq__(self, other):
+        if self is other:
+            return True
         if other is None:
             return False
         return self.directive == other.directive
 
     def __hash__(self):
-        return self.directive.__hash__
+        return hash(self.directive)
 
     def __ne__(self, other):
         return not self.__eq__(other)
 
+    def __reduce__(self):
+        return self.__class__, ()
+
     def __repr__(self):
         return self.directive
 
@@ -42,7 +83,9 @@ class DateElement(object):
 
 class AMPM(DateElement):
     """AM | PM"""
+    __slots__ = ()
     directive = '%p'
+    character_class = LETTERS
 
     @staticmethod
     def is_match(token):
@@ -55,8 +98,11 @@ class AMPM(DateElement):
 
 class DayOfMonth(DateElement):
     """1 .. 31"""
+    __slots__ = ()
 
     directive = '%d'
+    character_class = DIGITS
+    value_range = (1, 31)
 
     @staticmethod
     def is_match(token):
@@ -76,8 +122,17 @@ class Filler(DateElement):
     A special date class, filler matches everything. Filler is usually used for matches of whitespace
     and punctuation.
     """
-    def __init__(self, filler):
-        self.directive = filler.replace('%', '%%')  # escape %
+    __slots__ = ('directive',)
+
+    def __new__(cls, filler):
+        if not isinstance(filler, str):  # a token of a bytes example
+            filler = filler.decode('utf-8', 'replace')
+        elem = object.__new__(cls)
+        elem.directive = filler.replace('%', '%%')  # escape %
+        return elem
+
+    def __reduce__(self):
+        return self.__class__, (self.directive.replace('%%', '%'),)
 
     @staticmethod
     def is_match(token):
@@ -90,7 +145,10 @@ class Filler(DateElement):
 
 class Hour12(DateElement):
     """1 .. 12 (zero padding accepted)"""
+    __slots__ = ()
     directive = '%I'
+    character_class = DIGITS
+    value_range = (1, 12)
 
     @staticmethod
     def is_match(token):
@@ -107,7 +165,10 @@ class Hour12(DateElement):
 
 class Hour24(DateElement):
     """00 .. 23"""
+    __slots__ = ()
     directive = '%H'
+    character_class = DIGITS
+    value_range = (0, 23)
 
     @staticmethod
     def is_match(token):
@@ -124,7 +185,10 @@ class Hour24(DateElement):
 
 class Minute(DateElement):
     """00 .. 59"""
+    __slots__ = ()
     directive = '%M'
+    character_class = DIGITS
+    value_range = (0, 59)
 
     @staticmethod
     def is_match(token):
@@ -141,8 +205,11 @@ class Minute(DateElement):
 
 class MonthNum(DateElement):
     """1 .. 12"""
+    __slots__ = ()
 
     directive = '%m'
+    character_class = DIGITS
+    value_range = (1, 12)
 
     @staticmethod
     def is_match(token):
@@ -160,13 +227,15 @@ class MonthNum(DateElement):
 class MonthTextLong(DateElement):
     """January, February, ..., December
 
-    Uses calendar.month_name to provide localization
+    Uses calendar.month_name to provide localization (see refresh_names)
     """
+    __slots__ = ()
     directive = '%B'
+    character_class = LETTERS
 
     @staticmethod
     def is_match(token):
-        return token in calendar.month_name
+        return (_NAME_TABLE or name_table()).contains('%B', token)
 
     @staticmethod
     def is_numerical():
@@ -176,13 +245,15 @@ class MonthTextLong(DateElement):
 class MonthTextShort(DateElement):
     """Jan, Feb, ... Dec
 
-    Uses calendar.month_abbr to provide localization
+    Uses calendar.month_abbr to provide localization (see refresh_names)
     """
+    __slots__ = ()
     directive = '%b'
+    character_class = LETTERS
 
     @staticmethod
     def is_match(token):
-        return token in calendar.month_abbr
+        return (_NAME_TABLE or name_table()).contains('%b', token)
 
     @staticmethod
     def is_numerical():
@@ -194,7 +265,10 @@ class Second(DateElement):
 
     Normally, seconds range from 0 to 59. In the case of a leap second, the second value may be 60.
     """
+    __slots__ = ()
     directive = '%S'
+    character_class = DIGITS
+    value_range = (0, 60)
 
     @staticmethod
     def is_match(token):
@@ -211,11 +285,18 @@ class Second(DateElement):
 
 class Timezone(DateElement):
     """IANA common timezones (e.g. UTC, EST, US/Eastern, ...)"""
+    __slots__ = ()
     directive = '%Z'
+    character_class = LETTERS
 
     @staticmethod
     def is_match(token):
-        return token in pytz.all_timezones_set
+        if not token[:1].isalpha():  # every timezone name starts with a letter: no need to load the names
+            return False
+        names = _TIMEZONE_NAMES
+        if names is None:
+            names = timezone_names()
+        return token in names
 
     @staticmethod
     def is_numerical():
@@ -224,7 +305,11 @@ class Timezone(DateElement):
 
 class UTCOffset(DateElement):
     """UTC offset +0400 -1130"""
+    __slots__ = ()
     directive = '%z'
+    character_class = DIGITS
+    value_range = (0, 9999)
+    width = 4
 
     @staticmethod
     def is_match(token):
@@ -244,25 +329,33 @@ class UTCOffset(DateElement):
 class WeekdayLong(DateElement):
     """Sunday, Monday, ..., Saturday
 
-    Uses calendar.day_name to provide localization
+    Uses calendar.day_name to provide localization (see refresh_names)
     """
+    __slots__ = ()
     directive = '%A'
+    character_class = LETTERS
 
     @staticmethod
     def is_match(token):
-        return token in calendar.day_name
+        return (_NAME_TABLE or name_table()).contains('%A', token)
+
+    @staticmethod
+    def is_numerical():
+        return False
 
 
 class WeekdayShort(DateElement):
     """Sun, Mon, ... Sat
 
-    Uses calendar.day_abbr to provide localization
+    Uses calendar.day_abbr to provide localization (see refresh_names)
     """
+    __slots__ = ()
     directive = '%a'
+    character_class = LETTERS
 
     @staticmethod
     def is_match(token):
-        return token in calendar.day_abbr
+        return (_NAME_TABLE or name_table()).contains('%a', token)
 
     @staticmethod
     def is_numerical():
@@ -271,8 +364,12 @@ class WeekdayShort(DateElement):
 
 class Year2(DateElement):
     """00 .. 99"""
+    __slots__ = ()
 
     directive = '%y'
+    character_class = DIGITS
+    value_range = (0, 99)
+    width = 2
 
     @staticmethod
     def is_match(token):
@@ -291,8 +388,12 @@ class Year2(DateElement):
 
 class Year4(DateElement):
     """0000 .. 9999"""
+    __slots__ = ()
 
     directive = '%Y'
+    character_class = DIGITS
+    value_range = (0, 9999)
+    width = 4
 
     @staticmethod
     def is_match(token):
@@ -307,3 +408,136 @@ class Year4(DateElement):
     @staticmethod
     def is_numerical():
         return True
+
+
+def as_element(elem):
+    """
+    Return the interned instance for elem, a date element class or instance (the Filler class is returned as is)
+    """
+    if isinstance(elem, type) and issubclass(elem, DateElement) and elem is not Filler:
+        return elem()
+    return elem
+
+
+class NameTable(object):
+    """
+    Frozen lookup tables of the month and weekday names of a locale, for the directives %B, %b, %A and %a.
+
+    Each table is a frozenset, so matching a token is a single hash lookup. If fold_case is True, the tables hold
+    case-folded names and tokens are case-folded before lookup, so names match regardless of case.
+    """
+    __slots__ = ('fold_case', '_names', '_tables')
+
+    def __init__(self, month_name, month_abbr, day_name, day_abbr, fold_case=False):
+        """
+        Initialize the tables from sequences of names ordered as in calendar: month names start with an empty
+        name at index 0 and weekday names start with Monday.
+        """
+        self.fold_case = fold_case
+        self._names = {'%B': tuple(month_name), '%b': tuple(month_abbr), '%A': tuple(day_name),
+                       '%a': tuple(day_abbr)}
+        self._tables = {}
+        for directive, names in self._names.items():
+            self._tables[directive] = frozenset([name.casefold() if fold_case else name for name in names if name])
+
+    @classmethod
+    def from_calendar(cls, fold_case=False):
+        """
+        Return the NameTable of the names calendar provides for the current LC_TIME locale
+        """
+        return cls(calendar.month_name, calendar.month_abbr, calendar.day_name, calendar.day_abbr, fold_case)
+
+    def contains(self, directive, token):
+        """
+        Return True if token is one of the names of directive
+        """
+        if self.fold_case:
+            token = token.casefold()
+        return token in self._tables[directive]
+
+    def names(self, directive):
+        """
+        Return the tuple of names of directive, in calendar order
+        """
+        return self._names[directive]
+
+
+def name_table():
+    """
+    Return the NameTable used to match month and weekday names, building it from calendar on first use
+    """
+    table = _NAME_TABLE
+    if table is None:
+        with _NAME_LOCK:
+            table = _NAME_TABLE or refresh_names()
+    return table
+
+
+def refresh_names(fold_case=False):
+    """
+    Rebuild the month and weekday name tables from calendar and return the new NameTable. Call this after changing
+    the LC_TIME locale, or with fold_case=True to match names regardless of case. Token classifications memoized by
+    a classifier.TokenClassifier are discarded when it next counts tokens.
+    """
+    global _NAME_TABLE
+    _NAME_TABLE = NameTable.from_calendar(fold_case)
+    return _NAME_TABLE
+
+
+def set_timezone_source(source):
+    """
+    Choose where the timezone names matched by Timezone come from: 'pytz', 'zoneinfo' (the standard library and
+    the system or tzdata timezone database) or None (pytz if it is installed, zoneinfo otherwise). The names are
+    loaded again when next needed. Token classifications are memoized, so call this before inferring.
+    """
+    global _TIMEZONE_NAMES, _TIMEZONE_SOURCE
+    if source is not None and source not in TIMEZONE_SOURCES:
+        raise ValueError('timezone source must be one of {0} or None'.format(TIMEZONE_SOURCES))
+    with _TIMEZONE_LOCK:
+        _TIMEZONE_SOURCE = source
+        _TIMEZONE_NAMES = None
+
+
+def timezone_names():
+    """
+    Return the frozenset of timezone names matched by Timezone, loading it from the timezone source on first use
+    """
+    global _TIMEZONE_NAMES
+    names = _TIMEZONE_NAMES
+    if names is None:
+        with _TIMEZONE_LOCK:
+            if _TIMEZONE_NAMES is None:
+                _TIMEZONE_NAMES = _load_timezone_names(_TIMEZONE_SOURCE)
+            names = _TIMEZONE_NAMES
+    return names
+
+
+def _load_timezone_names(source):
+    """
+    Return the frozenset of timezone names provided by source (see set_timezone_source)
+    """
+    if source != 'zoneinfo':
+        try:
+            import pytz
+        except ImportError:
+            if source == 'pytz':
+                raise
+        else:
+            return frozenset(pytz.all_timezones)
+
+    import zoneinfo
+    # 'localtime' and 'Factory' are files of the system database, not timezones
+    return frozenset(zoneinfo.available_timezones()) - frozenset(['Factory', 'localtime'])
+
+
+def _intern(cls):
+    """
+    Return the single instance of the date element class cls, creating it if needed
+    """
+    elem = _INTERNED.get(cls)
+    if elem is None:
+        with _INTERN_LOCK:
+            elem = _INTERNED.get(cls)
+            if elem is None:
+                elem = _INTERNED[cls] = object.__new__(cls)
+    return elem
@@ -0,0 +1,140 @@
+import collections
+import csv
+import io
+import itertools
+import mmap
+import os
+import re
+from .streaming import StreamingInferrer
+
+
+_DIRECTIVE_RE = re.compile(r'%[^%]')
+
+
+def infer_file(path, delimiter=None, columns=None, header=True, encoding='utf-8', chunk_size=1000, alt_rules=None,
+               confidence=0.999, min_examples=100):
+    """
+    Infer the date format of columns of a delimited text (CSV/TSV) file, reading only as much of it as needed.
+
+    The file is read record by record with the csv module, so quoted fields may hold delimiters and line breaks.
+    Empty fields are skipped, and the values are fed chunk_size rows at a time into a StreamingInferrer per column.
+    Reading stops once every column is settled.
+
+    delimiter defaults to a tab for .tsv and .tab files and to a comma otherwise. columns is a list of column names
+    (if header is True) or indices; if None, every column is a candidate and columns that do not look like dates
+    after min_examples values are dropped.
+
+    Returns an OrderedDict of column name (or index, without a header) to format.
+    """
+    if delimiter is None:
+        delimiter = '\t' if path.lower().endswith(('.tsv', '.tab')) else ','
+
+    with io.open(path, 'r', encoding=encoding, newline='') as f:
+        records = csv.reader(f, delimiter=delimiter)
+        first = next(records, None)
+        if first is None:
+            return collections.OrderedDict()
+
+        if header:
+            names = first
+        else:
+            names = list(range(len(first)))
+            records = itertools.chain([first], records)
+        if columns is None:
+            selected = names
+        else:
+            selected = list(columns)
+        indices = [names.index(column) if header else column for column in selected]
+        if not indices:
+            return collections.OrderedDict()
+
+        inferrers = collections.OrderedDict()
+        for column in selected:
+            inferrers[column] = StreamingInferrer(alt_rules=alt_rules, confidence=confidence,
+                                                  min_examples=min_examples)
+        active = list(zip(selected, indices))
+        pending = dict((column, []) for column in selected)
+
+        rows = 0
+        for fields in records:
+            for column, index in active:
+                if index < len(fields) and fields[index]:
+                    pending[column].append(fields[index])
+            rows += 1
+            if rows % chunk_size == 0:
+                active = _update(inferrers, pending, active, discover=columns is None)
+                if not active:
+                    break
+        _update(inferrers, pending, active, discover=columns is None)
+
+    formats = collections.OrderedDict()
+    for column, inferrer in inferrers.items():
+        if inferrer is not None:
+            formats[column] = inferrer.infer()
+    return formats
+
+
+def infer_mmap(path, chunk_size=1000, alt_rules=None, confidence=0.999, min_examples=100, locale=None):
+    """
+    Infer the date format of the lines of a text file, one example per line, reading only as much of it as needed.
+
+    The file is memory-mapped and every non-empty line (without its line ending) is passed to a StreamingInferrer as
+    a memoryview of the map, chunk_size lines at a time, until the format is settled. Lines are neither copied nor
+    decoded: only their tokens are sliced out as bytes, and only distinct tokens are decoded (see
+    infer.tokenize_many). The file must be UTF-8 or ASCII encoded.
+    """
+    inferrer = StreamingInferrer(alt_rules=alt_rules, confidence=confidence, min_examples=min_examples,
+                                 locale=locale)
+    with io.open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:  # an empty file cannot be mapped
+            return inferrer.infer()
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            lines = _mapped_lines(mapped)
+            try:
+                inferrer.consume(lines, chunk_size)
+            except BaseException as e:
+                import traceback  # slow to import, and only needed here
+                traceback.clear_frames(e.__traceback__)  # the frames of consume hold memoryviews of the map
+                raise
+            finally:
+                lines.close()  # release the memoryviews of the map before closing it
+        finally:
+            mapped.close()
+    return inferrer.infer()
+
+
+def _mapped_lines(mapped):
+    """
+    Yield a memoryview of every non-empty line of the mmap mapped, without the line ending
+    """
+    view = memoryview(mapped)
+    size = len(mapped)
+    start = 0
+    while start < size:
+        end = mapped.find(b'\n', start)
+        if end < 0:
+            end = size
+        stop = end - 1 if end > start and view[end - 1] == 13 else end  # \r\n
+        if stop > start:
+            yield view[start:stop]
+        start = end + 1
+
+
+def _update(inferrers, pending, active, discover):
+    """
+    Feed the pending values of the active columns into their inferrers and return the columns that are still
+    active. If discover is True, a column whose format holds no date directive after min_examples values is dropped
+    from inferrers.
+    """
+    still_active = []
+    for column, index in active:
+        inferrer = inferrers[column]
+        inferrer.update_many(pending[column])
+        pending[column] = []
+        if discover and inferrer.examples_seen >= inferrer.min_examples \
+                and not _DIRECTIVE_RE.search(inferrer.infer().replace('%%', '')):
+            inferrers[column] = None
+        elif not inferrer.is_settled():
+            still_active.append((column, index))
+    return still_active
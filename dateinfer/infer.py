@@ -1,8 +1,13 @@
 import collections
-import itertools
+from . import parsing
+import re
 import string
-from date_elements import *
-from ruleproc import *
+import threading
+import timeit
+from .classifier import TokenClassifier
+from .date_elements import *
+from .locales import locale_letters, locale_names
+from .ruleproc import *
 
 # DATE_ELEMENTS is an ordered sequence of date elements, but does not include filler. It is ordered in
 # descending order of "restrictivity", the size of the range of acceptable inputs. The order is a little loose
@@ -25,6 +30,42 @@ DATE_ELEMENTS = (AMPM(),
                  WeekdayLong(),
                  Timezone())
 
+_CLASSIFIER = TokenClassifier(DATE_ELEMENTS)
+_RESTRICTIVENESS = dict([(elem.directive, rank) for rank, elem in enumerate(DATE_ELEMENTS)])  # see _most_restrictive
+
+# The tokenizer splits strings into runs of characters of the same class. A character outside of every class
+# (unprintable or non-ASCII) is a token of its own.
+_CHARACTER_CLASSES = [string.digits, string.ascii_letters, string.punctuation, string.whitespace]
+_TOKEN_RE = re.compile('|'.join(['[{0}]+'.format(re.escape(c)) for c in _CHARACTER_CLASSES] + ['.']), re.DOTALL)
+
+
+def _bytes_token_re(letters=''):
+    """
+    Return the tokenizer for UTF-8 encoded examples: the same classes as _TOKEN_RE, plus the non-ASCII characters in
+    letters as letters. Any other non-ASCII character is a token of its own, as in strings.
+    """
+    classes = [re.escape(c.encode('ascii')) for c in _CHARACTER_CLASSES]
+    letter_run = b'[' + classes[1] + b']'
+    if letters:
+        letter_run = b'(?:' + b'|'.join([letter_run] + [re.escape(c.encode('utf-8')) for c in letters]) + b')'
+    patterns = [b'[' + classes[0] + b']+', letter_run + b'+'] + [b'[' + c + b']+' for c in classes[2:]]
+    return re.compile(b'|'.join(patterns + [b'[\xc0-\xff][\x80-\xbf]*', b'.']), re.DOTALL)
+
+# Inference for a locale (see infer) uses a classifier matching the names of the locale, and a tokenizer whose
+# letter class also holds the non-ASCII letters of those names. They are built once per locale name table.
+_LocaleTables = collections.namedtuple('_LocaleTables', ['classifier', 'token_re', 'bytes_token_re'])
+_LOCALE_TABLES = {}  # locales.NameTable -> _LocaleTables
+_LOCALE_TABLES_LOCK = threading.Lock()
+_DEFAULT_TABLES = _LocaleTables(_CLASSIFIER, _TOKEN_RE, _bytes_token_re())
+
+# The shape signature of a string replaces every run of digits, letters and whitespace with a single representative
+# character and keeps punctuation: '2014-01-11 10:00:00' => '0-0-0 0:0:0'
+_SHAPE_SUBSTITUTIONS = [(re.compile('[{0}]+'.format(re.escape(c))), r) for c, r in
+                        [(string.digits, '0'), (string.ascii_letters, 'a'), (string.whitespace, ' ')]]
+
+FormatShare = collections.namedtuple('FormatShare', ['format', 'share'])
+FormatCandidate = collections.namedtuple('FormatCandidate', ['format', 'score'])
+
 F = Filler  # short-hand to clarify rules
 RULES = [
     If(Sequence(MonthNum, F(':'), '\d', F(':'), '\d'),
@@ -58,21 +99,167 @@ RULES = [
     If(Sequence(Hour24, '.', MonthNum), SwapSequence([Hour24, '.', MonthNum], [DayOfMonth, KeepOriginal, MonthNum])),
     If(Duplicate(MonthNum), Swap(MonthNum, DayOfMonth)),
     If(Sequence(F('+'), Year4), SwapSequence([F('+'), Year4], [UTCOffset, None])),
-    If(Sequence(F('-'), Year4), SwapSequence([F('+'), Year4], [UTCOffset, None]))
+    # a dash followed by four digits is a negative UTC offset after a time, but separates a year after a date
+    If(Sequence(F(' '), F('-'), Year4), SwapSequence([F(' '), F('-'), Year4], [KeepOriginal, UTCOffset, None])),
+    If(Sequence(Second, F('-'), Year4), SwapSequence([Second, F('-'), Year4], [KeepOriginal, UTCOffset, None]))
 ]
 
+_COMPILED_RULES = {}  # see _compiled_rules
 
-def infer(examples, alt_rules=None):
+
+def infer(examples, alt_rules=None, sample=None, cache=None, validate=False, stats=None, locale=None):
     """
     Returns a datetime.strptime-compliant format string for parsing the *most likely* date format
     used in examples. examples is a list containing example date strings.
+
+    If sample is 'reservoir' or 'stratified', the format is inferred from a random sample of examples that grows only
+    while the result is uncertain (see sampling.infer_sample), and a SampleResult of the format and the number of
+    examples examined is returned instead.
+
+    If cache is a cache.FormatCache, the format is looked up in (and added to) cache by the date elements the
+    examples are tagged with, which skips rule rewriting on a hit. cache is not used when sample is given.
+
+    If validate is True, every example is checked against the inferred format (see parsing.validate) and a tuple of
+    the usual result and a parsing.ValidationResult is returned. This reports the examples that do not parse,
+    including those ignored during inference because their token count differs from the most common one.
+
+    If stats is a stats.InferenceStats, the time spent in each stage, the examples dropped, the match probabilities
+    of every token position and the rules that fired are recorded in it. stats is not used when sample is given.
+
+    If locale is a locale name such as 'fr' or 'de_DE' (see locales.locale_names), month and weekday names are
+    matched in that language, regardless of case, instead of the names of the process locale. The process locale is
+    never changed, so calls for different locales can run concurrently.
     """
-    date_classes = _tag_most_likely(examples)
+    if validate:
+        examples = list(examples)
+        result = infer(examples, alt_rules=alt_rules, sample=sample, cache=cache, stats=stats, locale=locale)
+        date_string = result if sample is None else result.format
+        return result, parsing.validate(examples, date_string, locale=locale)
 
-    if alt_rules:
-        date_classes = _apply_rewrites(date_classes, alt_rules)
-    else:
-        date_classes = _apply_rewrites(date_classes, RULES)
+    if sample is not None:
+        from .sampling import infer_sample  # sampling depends on this module
+        return infer_sample(examples, method=sample, alt_rules=alt_rules, locale=locale)
+
+    rules = alt_rules if alt_rules else RULES
+    classifier = _locale_tables(locale).classifier
+    if stats is not None:
+        return _infer_with_stats(examples, rules, cache, stats, locale)
+    date_classes = _tag_most_likely_tokenized(tokenize_many(examples, locale), classifier=classifier)
+
+    if cache is not None:
+        elements = tuple(date_classes)
+        date_string = cache.get(rules, elements)
+        if date_string is None:
+            date_string = _format_string(date_classes, rules)
+            cache.put(rules, elements, date_string)
+        return date_string
+
+    return _format_string(date_classes, rules)
+
+
+def infer_all(examples, alt_rules=None):
+    """
+    Returns every distinct date format used in examples as a list of FormatShare tuples of the format and the
+    fraction of examples that follow it, most common first.
+
+    Instead of dropping the examples whose token count differs from the mode, examples are grouped by shape
+    signature (the pattern of character classes and punctuation, e.g. 2014-01-11 => 0-0-0) in a single pass and
+    each group is tagged separately. Groups that produce the same format are reported together.
+    """
+    groups = collections.OrderedDict()  # shape signature -> list of tokenized examples
+    for example in examples:
+        groups.setdefault(_shape_signature(example), []).append(_tokenize_by_character_class(example))
+
+    total = sum([len(group) for group in groups.values()])
+    counts = collections.OrderedDict()  # format -> number of examples
+    for group in groups.values():
+        date_classes = [_tag_position(collections.Counter(tokens)) for tokens in zip(*group)]
+        date_string = _format_string(date_classes, alt_rules if alt_rules else RULES)
+        counts[date_string] = counts.get(date_string, 0) + len(group)
+
+    shares = [FormatShare(f, float(n) / total) for f, n in counts.items()]
+    shares.sort(key=lambda share: share.share, reverse=True)  # stable: ties keep the order of first appearance
+    return shares
+
+
+def infer_candidates(examples, k=5, margin=0.1, beam_width=32, alt_rules=None, locale=None):
+    """
+    Returns up to k likely formats of examples as a list of FormatCandidate tuples of the format and its score, best
+    first. The first candidate is the format infer returns.
+
+    The examples are tokenized and counted once. For every token position, the candidates are the element infer
+    chooses plus every element whose match fraction is within margin of it (e.g. both MonthNum and DayOfMonth for
+    tokens from 01 to 12), and filler or the best element if it is within margin of the 0.5 filler threshold. A beam
+    search keeps the beam_width best combinations, each scored by the product of its match fractions (1 - the best
+    fraction for filler), and the rules are applied to each. Duplicate formats, and formats that use a directive
+    twice (which strptime rejects) or cannot parse the first example, are left out. Candidates with the same score
+    are formats the examples cannot tell apart; they are ordered by how close they are to infer's choice.
+    """
+    rules = alt_rules if alt_rules else RULES
+    classifier = _locale_tables(locale).classifier
+    tokenized_examples = tokenize_many(examples, locale)
+    token_lengths_mode = _mode([len(e) for e in tokenized_examples])
+    tokenized_examples = [example for example in tokenized_examples if len(example) == token_lengths_mode]
+
+    # Candidates are ranked by score, then by the number of positions where they differ from infer's choice, then
+    # by the restrictiveness of their elements, so the first candidate is infer's tagging
+    beam = [((), 1.0, 0, 0)]  # (date elements, score, differences, sum of restrictiveness ranks), best first
+    for tokens in zip(*tokenized_examples):
+        token_counts = collections.Counter(tokens)
+        options = _position_options(_position_probabilities(token_counts, classifier), token_counts, margin)
+        beam = [(elems + (elem,), score * p, differences + (i > 0),
+                 ranks + _RESTRICTIVENESS.get(elem.directive, len(DATE_ELEMENTS)))
+                for elems, score, differences, ranks in beam for i, (elem, p) in enumerate(options)]
+        beam.sort(key=lambda candidate: (-candidate[1], candidate[2], candidate[3]))
+        del beam[beam_width:]
+
+    candidates = []
+    for elems, score, _, _ in beam:
+        try:
+            date_string = _format_string(list(elems), rules)
+        except LookupError:  # a rule whose action does not apply to this tagging; infer would raise it too
+            if not candidates:
+                raise
+            continue
+        if candidates and (date_string in [c.format for c in candidates] or _repeats_directive(date_string) or
+                           not _parses(date_string, tokenized_examples[0][0][:0].join(tokenized_examples[0]), locale)):
+            continue
+        candidates.append(FormatCandidate(date_string, score))
+        if len(candidates) == k:
+            break
+    return candidates
+
+
+def _apply_rewrites(date_classes, rules, fired=None):
+    """
+    Return a list of date elements by applying rewrites to the initial date element list. If fired is a list, the
+    index in rules of every rule that fired is appended to it.
+    """
+    return _compiled_rules(rules).execute(date_classes, fired)
+
+
+def _compiled_rules(rules):
+    """
+    Return rules compiled with ruleproc.compile_rules. Compiled rule lists are kept for reuse, keyed by the identity
+    of the rules they contain (the compiled form refers to the rules, so their ids remain valid).
+    """
+    if isinstance(rules, CompiledRules):
+        return rules
+
+    key = tuple([id(rule) for rule in rules])
+    compiled = _COMPILED_RULES.get(key)
+    if compiled is None:
+        if len(_COMPILED_RULES) >= 64:
+            _COMPILED_RULES.clear()
+        compiled = _COMPILED_RULES[key] = compile_rules(rules)
+    return compiled
+
+
+def _format_string(date_classes, rules, fired=None):
+    """
+    Return the datetime.strptime-compliant format string for date_classes after applying rewrites from rules
+    """
+    date_classes = _apply_rewrites(date_classes, rules, fired)
 
     date_string = ''
     for date_class in date_classes:
@@ -81,19 +268,64 @@ def infer(examples, alt_rules=None):
     return date_string
 
 
-def _apply_rewrites(date_classes, rules):
+def _infer_with_stats(examples, rules, cache, stats, locale):
     """
-    Return a list of date elements by applying rewrites to the initial date element list
+    Same as infer without sample, recording the work done in stats. Kept apart from infer so that the timers cost
+    nothing when no stats are requested.
     """
-    for rule in rules:
-        date_classes = rule.execute(date_classes)
+    classifier = _locale_tables(locale).classifier
+    timer = timeit.default_timer
+    start = timer()
+    tokenized_examples = tokenize_many(examples, locale)
+    stats.tokenize_seconds += timer() - start
+    stats.calls += 1
+    stats.examples += len(tokenized_examples)
+
+    start = timer()
+    date_classes = _tag_most_likely_tokenized(tokenized_examples, stats, classifier)
+    stats.tag_seconds += timer() - start
 
-    return date_classes
+    if cache is not None:
+        elements = tuple(date_classes)
+        date_string = cache.get(rules, elements)
+        if date_string is not None:
+            stats.cache_hits += 1
+            return date_string
+
+    start = timer()
+    fired = []
+    date_string = _format_string(date_classes, rules, fired)
+    stats.rewrite_seconds += timer() - start
+    stats.rules_fired.update(fired)
+
+    if cache is not None:
+        cache.put(rules, elements, date_string)
+    return date_string
+
+
+def _locale_tables(locale):
+    """
+    Return the _LocaleTables for locale, or for the process locale if locale is None
+    """
+    if locale is None:
+        return _DEFAULT_TABLES
+    names = locale_names(locale)
+    tables = _LOCALE_TABLES.get(names)
+    if tables is None:
+        with _LOCALE_TABLES_LOCK:
+            tables = _LOCALE_TABLES.get(names)
+            if tables is None:
+                letters = locale_letters(locale)
+                classes = [c + letters if c == string.ascii_letters else c for c in _CHARACTER_CLASSES]
+                token_re = re.compile('|'.join(['[{0}]+'.format(re.escape(c)) for c in classes] + ['.']), re.DOTALL)
+                tables = _LOCALE_TABLES[names] = _LocaleTables(TokenClassifier(DATE_ELEMENTS, names=names), token_re,
+                                                               _bytes_token_re(letters))
+    return tables
 
 
 def _mode(elems):
     """
-    Find the mode (most common element) in list elems. If there are ties, this function returns the least value.
+    Find the mode (most common element) in list elems. If there are ties, this function returns the one seen first.
 
     If elems is an empty list, returns None.
     """
@@ -114,64 +346,145 @@ def _most_restrictive(date_elems):
     """
     most_index = len(DATE_ELEMENTS)
     for date_elem in date_elems:
-        if date_elem in DATE_ELEMENTS and DATE_ELEMENTS.index(date_elem) < most_index:
-            most_index = DATE_ELEMENTS.index(date_elem)
+        most_index = min(most_index, _RESTRICTIVENESS.get(date_elem.directive, most_index))
     if most_index < len(DATE_ELEMENTS):
         return DATE_ELEMENTS[most_index]
     else:
         raise KeyError('No least restrictive date element found')
 
 
+def _parses(date_string, example, locale):
+    """
+    Return True if example can be parsed with the format date_string
+    """
+    try:
+        return parsing.compile_parser(date_string, locale).is_valid(example)
+    except ValueError:  # a directive parsing does not support
+        return False
+
+
 def _percent_match(date_classes, tokens):
     """
     For each date class, return the percentage of tokens that the class matched (floating point [0.0 - 1.0]). The
     returned value is a tuple of length patterns. Tokens should be a list.
     """
-    match_count = [0] * len(date_classes)
-
-    for i, date_class in enumerate(date_classes):
-        for token in tokens:
-            if date_class.is_match(token):
-                match_count[i] += 1
+    classifier = _CLASSIFIER if date_classes is DATE_ELEMENTS else TokenClassifier(date_classes)
+    match_count = classifier.count(tokens)
 
     percentages = tuple([float(m) / len(tokens) for m in match_count])
     return percentages
 
 
+def _position_options(probabilities, token_counts, margin):
+    """
+    Return the candidate elements for a token position as a list of (element, score) tuples: first the element
+    _choose_element picks, then the alternatives, best first (see infer_candidates)
+    """
+    max_prob = max(probabilities)
+    best = _choose_element(probabilities, lambda: token_counts.most_common(1)[0][0])
+    if isinstance(best, Filler):
+        return [(best, 1.0 - max_prob)] + [(elem, prob) for elem, prob in zip(DATE_ELEMENTS, probabilities)
+                                           if prob > 0 and 0.5 - prob <= margin]
+
+    alternatives = []
+    if max_prob - 0.5 < margin:
+        alternatives.append((Filler(token_counts.most_common(1)[0][0]), 1.0 - max_prob))
+    for elem, prob in zip(DATE_ELEMENTS, probabilities):
+        if elem is not best and prob > 0 and max_prob - prob <= margin and 0.5 - prob <= margin:
+            alternatives.append((elem, prob))
+    alternatives.sort(key=lambda option: option[1], reverse=True)  # stable: ties keep the more restrictive first
+    return [(best, max_prob)] + alternatives
+
+
+def _repeats_directive(date_string):
+    """
+    Return True if a directive other than %% occurs more than once in date_string
+    """
+    directives = [d for d in re.findall('%.', date_string) if d != '%%']
+    return len(set(directives)) < len(directives)
+
+
+def _shape_signature(s):
+    """
+    Return the shape signature of s (see _SHAPE_SUBSTITUTIONS). Strings with the same shape signature have the same
+    number of tokens and the same character class at every token position.
+    """
+    for pattern, replacement in _SHAPE_SUBSTITUTIONS:
+        s = pattern.sub(replacement, s)
+    return s
+
+
 def _tag_most_likely(examples):
     """
     Return a list of date elements by choosing the most likely element for a token within examples (context-free).
     """
-    tokenized_examples = [_tokenize_by_character_class(example) for example in examples]
+    return _tag_most_likely_tokenized(tokenize_many(examples))
+
+
+def _tag_most_likely_tokenized(tokenized_examples, stats=None, classifier=_CLASSIFIER):
+    """
+    Same as _tag_most_likely, given the tokenized examples.
 
+    If stats is given, the number of examples dropped and the match probabilities of every position are recorded in
+    it. Tokens are classified by classifier.
+    """
     # We currently need the tokenized_examples to all have the same length, so drop instances that have a length
     # that does not equal the mode of lengths within tokenized_examples
     token_lengths = [len(e) for e in tokenized_examples]
     token_lengths_mode = _mode(token_lengths)
     tokenized_examples = [example for example in tokenized_examples if len(example) == token_lengths_mode]
+    if stats is not None:
+        stats.dropped += len(token_lengths) - len(tokenized_examples)
+        stats.positions = []
 
-    # Now, we iterate through the tokens, assigning date elements based on their likelihood. In cases where
-    # the assignments are unlikely for all date elements, assign filler.
+    # Now, we iterate through the tokens, assigning date elements based on their likelihood.
     most_likely = []
-    for token_index in range(0, token_lengths_mode):
-        tokens = [token[token_index] for token in tokenized_examples]
-        probabilities = _percent_match(DATE_ELEMENTS, tokens)
-        max_prob = max(probabilities)
-        if max_prob < 0.5:
-            most_likely.append(Filler(_mode(tokens)))
+    for tokens in zip(*tokenized_examples):
+        if stats is not None:
+            token_counts = collections.Counter(tokens)
+            probabilities = _position_probabilities(token_counts, classifier)
+            most_likely.append(_choose_element(probabilities, lambda: token_counts.most_common(1)[0][0]))
         else:
-            if probabilities.count(max_prob) == 1:
-                most_likely.append(DATE_ELEMENTS[probabilities.index(max_prob)])
-            else:
-                choices = []
-                for index, prob in enumerate(probabilities):
-                    if prob == max_prob:
-                        choices.append(DATE_ELEMENTS[index])
-                most_likely.append(_most_restrictive(choices))
-
+            most_likely.append(_tag_position(collections.Counter(tokens), classifier))
+        if stats is not None:
+            stats.positions.append(dict([(elem.directive, p) for elem, p in zip(DATE_ELEMENTS, probabilities) if p]))
     return most_likely
 
 
+def _position_probabilities(token_counts, classifier=_CLASSIFIER):
+    """
+    For each element of DATE_ELEMENTS, return the percentage of the tokens counted in token_counts (a mapping of
+    token to number of occurrences) that the element matched. Each distinct token is classified once into a bitmask
+    of matching date elements by classifier; the match counts are the sum of those bitmasks.
+    """
+    total = sum(token_counts.values())
+    match_count = classifier.count_masks(classifier.mask_counts(token_counts))
+    return tuple([float(m) / total for m in match_count])
+
+
+def _tag_position(token_counts, classifier=_CLASSIFIER):
+    """
+    Return the most likely date element for a single token position given token_counts, a Counter of the tokens
+    found at that position.
+    """
+    return _choose_element(_position_probabilities(token_counts, classifier),
+                           lambda: token_counts.most_common(1)[0][0])
+
+
+def _choose_element(probabilities, filler_text, date_elements=DATE_ELEMENTS, filler_threshold=0.5):
+    """
+    Return the most likely date element for a token position given the probabilities of the elements of
+    date_elements. In cases where the assignments are unlikely for all date elements (below filler_threshold),
+    assign filler; filler_text is called to get the most common token in that case.
+    """
+    max_prob = max(probabilities)
+    if max_prob < filler_threshold:
+        return Filler(filler_text())
+    else:
+        # DATE_ELEMENTS is in order of restrictivity, so the first of several tied elements is the most restrictive
+        return date_elements[probabilities.index(max_prob)]
+
+
 def _tokenize_by_character_class(s):
     """
     Return a list of strings by splitting s (tokenizing) by character class.
@@ -181,23 +494,19 @@ def _tokenize_by_character_class(s):
         '54', ':', '52', ' ', 'MST', ' ', '2014']
     _tokenize_by_character_class('2013-08-14') => ['2013', '-', '08', '-', '14']
     """
-    character_classes = [string.digits, string.ascii_letters, string.punctuation, string.whitespace]
-
-    result = []
-    rest = list(s)
-    while rest:
-        progress = False
-        for character_class in character_classes:
-            if rest[0] in character_class:
-                progress = True
-                token = ''
-                for take_away in itertools.takewhile(lambda c: c in character_class, rest[:]):
-                    token += take_away
-                    rest.pop(0)
-                result.append(token)
-                break
-        if not progress:  # none of the character classes matched; unprintable character?
-            result.append(rest[0])
-            rest = rest[1:]
-
-    return result
+    return _TOKEN_RE.findall(s)
+
+
+def tokenize_many(examples, locale=None):
+    """
+    Return a list containing the tokenized form (see _tokenize_by_character_class) of each string in examples.
+    If locale is given, the letters of its month and weekday names are letters for the tokenizer (see infer).
+
+    An example may also be UTF-8 encoded bytes, a bytearray or a memoryview (e.g. a slice of an mmap); its tokens are
+    then bytes sliced out of it, without decoding the example. The classifier decodes a token only the first time
+    it sees it, so a column of bytes is classified like the same column of strings.
+    """
+    tables = _locale_tables(locale)
+    findall = tables.token_re.findall
+    findall_bytes = tables.bytes_token_re.findall
+    return [findall(example) if isinstance(example, str) else findall_bytes(example) for example in examples]
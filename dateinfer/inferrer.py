@@ -0,0 +1,111 @@
+import collections
+from .classifier import TokenClassifier
+from .infer import DATE_ELEMENTS, RULES, _choose_element, _locale_tables, _mode
+from .locales import locale_names
+from .ruleproc import compile_rules
+
+
+LENGTH_POLICIES = ('mode', 'mode_longest', 'strict')
+
+
+class Inferrer(object):
+    """
+    A reusable, immutable date format inferrer.
+
+    Everything infer.infer derives from its module-level tables on every call (the token classifier, the compiled
+    rules, the tokenizer and the element priorities) is built once, when the Inferrer is created. An Inferrer cannot
+    be modified afterwards and may be shared between threads.
+    """
+    __slots__ = ('date_elements', 'rules', 'filler_threshold', 'length_policy', 'locale', '_classifier',
+                 '_compiled_rules', '_findall', '_findall_bytes')
+
+    def __init__(self, date_elements=DATE_ELEMENTS, rules=RULES, filler_threshold=0.5, length_policy='mode',
+                 locale=None):
+        """
+        date_elements is the sequence of candidate date elements, in descending order of restrictivity (ties are
+        won by the first element); rules the list of rewrite rules applied to the tagged elements.
+
+        A token position whose best element matches less than filler_threshold of the examples becomes filler.
+
+        length_policy decides which examples are used when they do not all have the same number of tokens:
+        mode: the examples with the most common token count, the count seen first winning ties (as infer.infer)
+        mode_longest: same, the larger count winning ties
+        strict: infer raises ValueError
+
+        locale is used as in infer.infer.
+        """
+        if length_policy not in LENGTH_POLICIES:
+            raise ValueError('length_policy must be one of {0}'.format(LENGTH_POLICIES))
+        if not 0.0 < filler_threshold <= 1.0:
+            raise ValueError('filler_threshold must be in (0, 1]')
+
+        set_attribute = super(Inferrer, self).__setattr__
+        set_attribute('date_elements', tuple([elem() if isinstance(elem, type) else elem for elem in date_elements]))
+        set_attribute('rules', tuple(rules))
+        set_attribute('filler_threshold', filler_threshold)
+        set_attribute('length_policy', length_policy)
+        set_attribute('locale', locale)
+        names = None if locale is None else locale_names(locale)
+        set_attribute('_classifier', TokenClassifier(self.date_elements, names=names))
+        set_attribute('_compiled_rules', compile_rules(self.rules))
+        set_attribute('_findall', _locale_tables(locale).token_re.findall)
+        set_attribute('_findall_bytes', _locale_tables(locale).bytes_token_re.findall)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('Inferrer is immutable')
+
+    def __delattr__(self, name):
+        raise AttributeError('Inferrer is immutable')
+
+    def __repr__(self):
+        return 'Inferrer(filler_threshold={0!r}, length_policy={1!r}, locale={2!r})'.format(
+            self.filler_threshold, self.length_policy, self.locale)
+
+    def infer(self, examples):
+        """
+        Return the datetime.strptime-compliant format string for the most likely date format used in examples.
+        Examples may be strings or UTF-8 encoded bytes, as in infer.tokenize_many.
+        """
+        findall = self._findall
+        findall_bytes = self._findall_bytes
+        tokenized_examples = self._select_length([findall(example) if isinstance(example, str)
+                                                  else findall_bytes(example) for example in examples])
+
+        classifier = self._classifier
+        date_elements = self.date_elements
+        filler_threshold = self.filler_threshold
+        most_likely = []
+        for tokens in zip(*tokenized_examples):
+            token_counts = collections.Counter(tokens)
+            match_count = classifier.count_masks(classifier.mask_counts(token_counts))
+            total = float(len(tokens))
+            probabilities = tuple([m / total for m in match_count])
+            most_likely.append(_choose_element(probabilities, lambda: token_counts.most_common(1)[0][0],
+                                               date_elements, filler_threshold))
+
+        return ''.join([elem.directive for elem in self._compiled_rules.execute(most_likely)])
+
+    def infer_many(self, columns):
+        """
+        Return the format of every list of examples in columns: a dict with the same keys if columns is a mapping,
+        otherwise a list in the same order
+        """
+        if hasattr(columns, 'keys'):
+            return dict([(name, self.infer(columns[name])) for name in columns.keys()])
+        return [self.infer(examples) for examples in columns]
+
+    def _select_length(self, tokenized_examples):
+        """
+        Return the tokenized examples used for tagging, following length_policy
+        """
+        lengths = [len(tokens) for tokens in tokenized_examples]
+        if self.length_policy == 'mode':
+            length = _mode(lengths)
+        elif self.length_policy == 'mode_longest':
+            counts = collections.Counter(lengths)
+            length = max(counts.items(), key=lambda item: (item[1], item[0]))[0] if counts else None
+        else:
+            if len(set(lengths)) > 1:
+                raise ValueError('examples have different numbers of tokens: {0}'.format(sorted(set(lengths))))
+            return tokenized_examples
+        return [tokens for tokens in tokenized_examples if len(tokens) == length]
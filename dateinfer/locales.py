@@ -0,0 +1,98 @@
+import threading
+from .date_elements import NameTable
+
+
+# Month and weekday names of the locales known without consulting the operating system, as (month names,
+# abbreviated month names, weekday names, abbreviated weekday names). Months start with January and weekdays with
+# Monday, as in calendar. Abbreviations are given without the trailing period some locales use, since the
+# tokenizer splits the period off.
+LOCALE_NAMES = {
+    'de': (['Januar', 'Februar', 'März', 'April', 'Mai', 'Juni', 'Juli', 'August', 'September', 'Oktober',
+            'November', 'Dezember'],
+           ['Jan', 'Feb', 'Mär', 'Apr', 'Mai', 'Jun', 'Jul', 'Aug', 'Sep', 'Okt', 'Nov', 'Dez'],
+           ['Montag', 'Dienstag', 'Mittwoch', 'Donnerstag', 'Freitag', 'Samstag', 'Sonntag'],
+           ['Mo', 'Di', 'Mi', 'Do', 'Fr', 'Sa', 'So']),
+    'en': (['January', 'February', 'March', 'April', 'May', 'June', 'July', 'August', 'September', 'October',
+            'November', 'December'],
+           ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'],
+           ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday'],
+           ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']),
+    'es': (['enero', 'febrero', 'marzo', 'abril', 'mayo', 'junio', 'julio', 'agosto', 'septiembre', 'octubre',
+            'noviembre', 'diciembre'],
+           ['ene', 'feb', 'mar', 'abr', 'may', 'jun', 'jul', 'ago', 'sep', 'oct', 'nov', 'dic'],
+           ['lunes', 'martes', 'miércoles', 'jueves', 'viernes', 'sábado', 'domingo'],
+           ['lun', 'mar', 'mié', 'jue', 'vie', 'sáb', 'dom']),
+    'fr': (['janvier', 'février', 'mars', 'avril', 'mai', 'juin', 'juillet', 'août', 'septembre', 'octobre',
+            'novembre', 'décembre'],
+           ['janv', 'févr', 'mars', 'avr', 'mai', 'juin', 'juil', 'août', 'sept', 'oct', 'nov', 'déc'],
+           ['lundi', 'mardi', 'mercredi', 'jeudi', 'vendredi', 'samedi', 'dimanche'],
+           ['lun', 'mar', 'mer', 'jeu', 'ven', 'sam', 'dim']),
+    'it': (['gennaio', 'febbraio', 'marzo', 'aprile', 'maggio', 'giugno', 'luglio', 'agosto', 'settembre',
+            'ottobre', 'novembre', 'dicembre'],
+           ['gen', 'feb', 'mar', 'apr', 'mag', 'giu', 'lug', 'ago', 'set', 'ott', 'nov', 'dic'],
+           ['lunedì', 'martedì', 'mercoledì', 'giovedì', 'venerdì', 'sabato', 'domenica'],
+           ['lun', 'mar', 'mer', 'gio', 'ven', 'sab', 'dom']),
+    'nl': (['januari', 'februari', 'maart', 'april', 'mei', 'juni', 'juli', 'augustus', 'september', 'oktober',
+            'november', 'december'],
+           ['jan', 'feb', 'mrt', 'apr', 'mei', 'jun', 'jul', 'aug', 'sep', 'okt', 'nov', 'dec'],
+           ['maandag', 'dinsdag', 'woensdag', 'donderdag', 'vrijdag', 'zaterdag', 'zondag'],
+           ['ma', 'di', 'wo', 'do', 'vr', 'za', 'zo']),
+}
+
+_TABLES = {}  # locale key -> NameTable
+_TABLES_LOCK = threading.Lock()
+
+
+def locale_names(locale):
+    """
+    Return the NameTable of locale, built once and cached. locale is a name such as 'fr', 'de_DE' or 'de_DE.UTF-8';
+    a locale whose names are not known falls back to its language. Names match regardless of case, as in strptime.
+    Raises ValueError for an unknown locale (see register_locale). The process locale is never changed.
+    """
+    key = _locale_key(locale)
+    table = _TABLES.get(key)
+    if table is None:
+        with _TABLES_LOCK:
+            table = _TABLES.get(key)
+            if table is None:
+                month_name, month_abbr, day_name, day_abbr = LOCALE_NAMES[key]
+                table = _TABLES[key] = NameTable([''] + list(month_name), [''] + list(month_abbr), day_name,
+                                                 day_abbr, fold_case=True)
+    return table
+
+
+def locale_letters(locale):
+    """
+    Return a string of the non-ASCII letters (in both cases) used by the names of locale, in sorted order
+    """
+    table = locale_names(locale)
+    letters = set()
+    for directive in ('%B', '%b', '%A', '%a'):
+        for name in table.names(directive):
+            letters.update([c for c in name if c.isalpha() and ord(c) > 127])
+    return ''.join(sorted(letters | set([c.upper() for c in letters]) | set([c.lower() for c in letters])))
+
+
+def register_locale(locale, month_name, month_abbr, day_name, day_abbr):
+    """
+    Add or replace the names of locale, given as in LOCALE_NAMES (12 months from January, 7 weekdays from Monday)
+    """
+    if len(month_name) != 12 or len(month_abbr) != 12 or len(day_name) != 7 or len(day_abbr) != 7:
+        raise ValueError('expected 12 month names and 7 weekday names')
+    key = locale.lower().replace('-', '_')
+    with _TABLES_LOCK:
+        LOCALE_NAMES[key] = (list(month_name), list(month_abbr), list(day_name), list(day_abbr))
+        _TABLES.pop(key, None)
+
+
+def _locale_key(locale):
+    """
+    Return the key of LOCALE_NAMES for locale: its normalized name if known, otherwise its language
+    """
+    key = locale.lower().replace('-', '_').split('.')[0].split('@')[0]
+    if key in LOCALE_NAMES:
+        return key
+    language = key.split('_')[0]
+    if language in LOCALE_NAMES:
+        return language
+    raise ValueError("unknown locale '{0}'; see locales.register_locale".format(locale))
@@ -0,0 +1,81 @@
+import collections
+from .infer import _locale_tables, _position_probabilities, infer, tokenize_many
+
+
+TimestampSpan = collections.namedtuple('TimestampSpan', ['format', 'start', 'end', 'token_start', 'token_end'])
+
+
+def locate_and_infer(lines, max_tokens=64, threshold=0.5, max_gap=3, alt_rules=None, locale=None):
+    """
+    Find the timestamp in lines (e.g. the lines of a log file) and infer its format.
+
+    The lines are tokenized once and compared token position by token position from the start of the line, so the
+    timestamp must be preceded by the same number of tokens on every line, as in most log formats. Positions
+    beyond max_tokens are ignored. A position held by at least threshold of the lines is a date position if a date
+    element matches at least threshold of its tokens (see infer), and a separator if at least threshold of its
+    tokens are the same. The timestamp is the run of date positions joined by at most max_gap consecutive
+    separators with the highest sum of match fractions (the first one wins ties), so message text after it, whose
+    token positions do not line up, does not take part.
+
+    Returns a TimestampSpan of the format of the timestamps (inferred by infer.infer with alt_rules and locale), the
+    character offsets of the timestamp in the lines (the most common ones, so line[start:end] is the timestamp if
+    the text before it has a fixed width) and its token positions (tokens[token_start:token_end] of
+    infer.tokenize_many(lines) in any case). Returns None if no date position is found.
+    """
+    classifier = _locale_tables(locale).classifier
+    tokenized_lines = [tokens[:max_tokens] for tokens in tokenize_many(lines, locale)]
+    minimum = threshold * len(tokenized_lines)
+
+    scores = []  # for every token position, the match fraction of a date position, 0 for a separator, else None
+    for position in range(max([len(tokens) for tokens in tokenized_lines] or [0])):
+        column = [tokens[position] for tokens in tokenized_lines if len(tokens) > position]
+        if len(column) < minimum:
+            break
+        token_counts = collections.Counter(column)
+        max_prob = max(_position_probabilities(token_counts, classifier))
+        if max_prob >= threshold:
+            scores.append(max_prob)
+        elif token_counts.most_common(1)[0][1] >= threshold * len(column):
+            scores.append(0.0)
+        else:
+            scores.append(None)
+
+    token_start, token_end = _best_run(scores, max_gap)
+    if token_start is None:
+        return None
+
+    timestamps = []
+    offsets = collections.Counter()
+    for tokens in tokenized_lines:
+        if len(tokens) >= token_end:
+            prefix = tokens[0][:0].join(tokens[:token_start])  # '' or b''
+            timestamp = prefix[:0].join(tokens[token_start:token_end])
+            timestamps.append(timestamp)
+            offsets[len(prefix), len(prefix) + len(timestamp)] += 1
+    start, end = offsets.most_common(1)[0][0]
+    return TimestampSpan(infer(timestamps, alt_rules=alt_rules, locale=locale), start, end, token_start, token_end)
+
+
+def _best_run(scores, max_gap):
+    """
+    Return the token positions [start, end) of the run of date positions (positive scores) joined by at most
+    max_gap consecutive separators (zero scores) with the greatest total score, or (None, None) if there is none
+    """
+    best = (0.0, None, None)
+    start = None
+    total = 0.0
+    gap = 0
+    for position, score in enumerate(scores + [None]):
+        if score:  # a date position
+            if start is None:
+                start, total = position, 0.0
+            total += score
+            gap = 0
+            if total > best[0]:
+                best = (total, start, position + 1)
+        elif score is not None and start is not None and gap < max_gap:  # a separator within a run
+            gap += 1
+        else:
+            start = None
+            gap = 0
+    return best[1], best[2]
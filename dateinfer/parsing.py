@@ -0,0 +1,243 @@
+import calendar
+import collections
+import datetime
+import re
+import time
+from .date_elements import name_table
+from .locales import locale_names
+
+
+# Indices of the fields of a parsed date
+YEAR, MONTH, DAY, HOUR, MINUTE, SECOND, TZINFO, PM = range(8)
+_DEFAULTS = (1900, 1, 1, 0, 0, 0, None, None)
+_DAYS_IN_MONTH = (0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+ValidationResult = collections.namedtuple('ValidationResult', ['rate', 'matched', 'total', 'failures'])
+
+# directive -> (regular expression, field, conversion). The expressions are those used by datetime.strptime.
+_NUMERIC_DIRECTIVES = {
+    'Y': (r'(\d\d\d\d)', YEAR, int),
+    'y': (r'(\d\d)', YEAR, lambda s: int(s) + (2000 if int(s) <= 68 else 1900)),
+    'm': (r'(1[0-2]|0[1-9]|[1-9])', MONTH, int),
+    'd': (r'(3[01]|[12]\d|0[1-9]|[1-9]| [1-9])', DAY, int),
+    'H': (r'(2[0-3]|[0-1]\d|\d)', HOUR, int),
+    'I': (r'(1[0-2]|0[1-9]|[1-9])', HOUR, int),
+    'M': (r'([0-5]\d|\d)', MINUTE, int),
+    'S': (r'(6[0-1]|[0-5]\d|\d)', SECOND, int),
+}
+
+
+class CompiledParser(object):
+    """
+    A parser for a single datetime.strptime format string, as returned by compile_parser.
+
+    The whole format is translated once into a single regular expression with one group per directive, and every
+    directive into the field of the date it sets and a conversion, so parsing a value is one match followed by
+    direct field extraction. Supported directives are those infer emits: %Y %y %m %d %H %I %M %S %p %b %B %a %A
+    %z %Z and %%, plus literal text (whitespace matches any run of whitespace, as in strptime). Names are matched
+    without regard to case. %a, %A and %Z are matched but do not change the result, so results are naive unless the
+    format contains %z. As in strptime, %Z only accepts UTC, GMT and the names of the local timezone (time.tzname),
+    not every timezone name infer recognizes, and %z only accepts offsets of less than 24 hours.
+
+    If locale is given, names are those of locales.locale_names(locale) instead of the process locale.
+    """
+
+    def __init__(self, fmt, locale=None):
+        self.format = fmt
+        self.locale = locale
+        self._name_table = name_table() if locale is None else locale_names(locale)
+        self._converters = []  # (group index, field, conversion)
+        self._twelve_hour = False
+
+        pattern = ''
+        groups = 0
+        pos = 0
+        while pos < len(fmt):
+            char = fmt[pos]
+            if char != '%':
+                pattern += r'\s+' if char.isspace() else re.escape(char)
+                pos += 1
+                while char.isspace() and pos < len(fmt) and fmt[pos].isspace():  # a run of whitespace
+                    pos += 1
+                continue
+            if pos + 1 == len(fmt):
+                raise ValueError("stray % in format '{0}'".format(fmt))
+            directive = fmt[pos + 1]
+            pos += 2
+            if directive == '%':
+                pattern += '%'
+                continue
+            expression, field, conversion = self._directive(directive)
+            pattern += expression
+            if field is not None:
+                self._converters.append((groups, field, conversion))
+            groups += 1
+
+        self._match = re.compile(pattern + r'\Z', re.IGNORECASE).match
+
+    def _directive(self, directive):
+        """
+        Return the regular expression, field and conversion for directive
+        """
+        if directive in _NUMERIC_DIRECTIVES:
+            if directive == 'I':
+                self._twelve_hour = True
+            return _NUMERIC_DIRECTIVES[directive]
+        elif directive == 'p':
+            return '(am|pm)', PM, lambda s: s.lower() == 'pm'
+        elif directive in ('b', 'B'):
+            names = self._name_table.names('%' + directive)
+            return _names(names), MONTH, _index_of(names)
+        elif directive in ('a', 'A'):
+            return _names(self._name_table.names('%' + directive)), None, None
+        elif directive == 'z':
+            return r'([+-]\d\d:?[0-5]\d|(?-i:Z))', TZINFO, _utc_offset
+        elif directive == 'Z':
+            return _names(_local_timezone_names()), None, None
+        else:
+            raise ValueError("'%{0}' is not supported in format '{1}'".format(directive, self.format))
+
+    def parse(self, value):
+        """
+        Return the datetime.datetime for value. Raises ValueError, as datetime.strptime does, if value does not
+        match the format or is not a valid date.
+        """
+        fields = self._fields(value)
+        if fields is None:
+            raise ValueError("time data '{0}' does not match format '{1}'".format(value, self.format))
+        return datetime.datetime(fields[YEAR], fields[MONTH], fields[DAY], fields[HOUR], fields[MINUTE], fields[SECOND],
+                                 tzinfo=fields[TZINFO])
+
+    def is_valid(self, value):
+        """
+        Return True if value can be parsed, i.e. if parse(value) would not raise ValueError
+        """
+        fields = self._fields(value)
+        if fields is None or fields[SECOND] > 59 or fields[YEAR] < 1:  # datetime has no year 0
+            return False
+        month = fields[MONTH]
+        day = fields[DAY]
+        if month == 2 and day == 29:
+            return calendar.isleap(fields[YEAR])
+        return day <= _DAYS_IN_MONTH[month]
+
+    def parse_many(self, values, errors='raise'):
+        """
+        Return a list of the datetime.datetime for every value in values. If errors is 'coerce', values that cannot
+        be parsed produce None instead of raising ValueError.
+        """
+        if errors not in ('raise', 'coerce'):
+            raise ValueError("errors must be 'raise' or 'coerce', not '{0}'".format(errors))
+
+        parse = self.parse
+        if errors == 'raise':
+            return [parse(value) for value in values]
+
+        result = []
+        for value in values:
+            try:
+                result.append(parse(value))
+            except ValueError:
+                result.append(None)
+        return result
+
+    def _fields(self, value):
+        """
+        Return the list of fields (indexed by YEAR, MONTH, ...) of value, or None if value does not match. value may
+        be UTF-8 encoded bytes.
+        """
+        if not isinstance(value, str):
+            value = bytes(value).decode('utf-8', 'replace')
+        match = self._match(value)
+        if match is None:
+            return None
+
+        fields = list(_DEFAULTS)
+        groups = match.groups()
+        try:
+            for group, field, conversion in self._converters:
+                fields[field] = conversion(groups[group])
+        except ValueError:  # a UTC offset of 24 hours or more
+            return None
+
+        if self._twelve_hour:  # as in strptime, %I without %p is taken as AM
+            hour = fields[HOUR] % 12
+            fields[HOUR] = hour + 12 if fields[PM] else hour
+        return fields
+
+
+def compile_parser(fmt, locale=None):
+    """
+    Return a CompiledParser for the datetime.strptime format string fmt, with names in the language of locale
+    """
+    return CompiledParser(fmt, locale)
+
+
+def validate(examples, fmt, max_failures=10, locale=None):
+    """
+    Check how many of examples can be parsed by datetime.strptime with the format fmt.
+
+    Every example is matched by a CompiledParser and its fields are checked for a valid date, so no exception is
+    raised or caught per example. The results of up to 65536 distinct examples are memoized for repeated values.
+    Returns a ValidationResult of the fraction of examples that parse (1.0 if there are none), the number that
+    parse, the number of examples and a list of at most max_failures of the examples that do not parse, in order of
+    appearance. locale is used as in compile_parser.
+    """
+    parser = compile_parser(fmt, locale)
+    is_valid = parser.is_valid
+    seen = {}  # example -> is valid, cleared when full
+    matched = 0
+    total = 0
+    failures = []
+    for example in examples:
+        total += 1
+        if not isinstance(example, (str, bytes)):
+            example = bytes(example)  # a bytearray or memoryview, which may not be hashable
+        valid = seen.get(example)
+        if valid is None:
+            if len(seen) >= 65536:
+                seen.clear()
+            valid = seen[example] = is_valid(example)
+        if valid:
+            matched += 1
+        elif len(failures) < max_failures:
+            failures.append(example)
+
+    return ValidationResult(float(matched) / total if total else 1.0, matched, total, failures)
+
+
+def _index_of(names):
+    """
+    Return a function mapping a name from names, in any case, to its index
+    """
+    indices = dict([(name.lower(), index) for index, name in enumerate(names) if name])
+    return lambda s: indices[s.lower()]
+
+
+def _local_timezone_names():
+    """
+    Return the timezone names datetime.strptime accepts for %Z: UTC, GMT and the names of the local timezone
+    """
+    names = set(['utc', 'gmt', time.tzname[0].lower()])
+    if time.daylight:
+        names.add(time.tzname[1].lower())
+    return list(names)
+
+
+def _names(names):
+    """
+    Return a regular expression group matching any of names, longest first
+    """
+    names = sorted([name for name in names if name], key=len, reverse=True)
+    return '(' + '|'.join([re.escape(name) for name in names]) + ')'
+
+
+def _utc_offset(s):
+    """
+    Return a datetime.timezone for a UTC offset of the form +hhmm, +hh:mm or Z. Raises ValueError if the offset is
+    24 hours or more.
+    """
+    if s == 'Z':
+        return datetime.timezone.utc
+    minutes = int(s[1:3]) * 60 + int(s[-2:])
+    return datetime.timezone(datetime.timedelta(minutes=-minutes if s[0] == '-' else minutes))
@@ -1,4 +1,4 @@
-from date_elements import Filler
+from .date_elements import Filler, as_element
 
 
 class If(object):
@@ -22,6 +22,88 @@ class If(object):
         else:
             return elem_list
 
+    def apply(self, elem_list):
+        """
+        If condition, permute the list elem_list in place by executing action. Returns True if action was executed.
+        """
+        if self.condition.is_true(elem_list):
+            self.action.apply(elem_list)
+            return True
+        return False
+
+
+class CompiledRules(object):
+    """
+    A list of rules compiled into an indexed form (see compile_rules). It iterates over the original rules, so it
+    can be used wherever a list of rules is expected.
+
+    Every directive required by a rule's condition (see ConditionClause.required_directives) is assigned a bit. When
+    executing, the directives present in the element list are summarized in a bitset, and a rule is skipped without
+    evaluating its condition when one of its required bits is missing.
+
+    Element lists are plain lists of date elements rather than arrays of integer element codes. They hold a few
+    dozen entries, the bitset already gives conditions their integer test, and filler texts, which are unbounded,
+    would need a code table of their own.
+    """
+    def __init__(self, rules):
+        self.rules = tuple(rules)
+        self._bits = {}  # directive -> bit
+        self._entries = []  # (required bits, rule)
+        for rule in self.rules:
+            required = 0
+            condition = getattr(rule, 'condition', None)
+            if isinstance(condition, ConditionClause):
+                for directive in condition.required_directives():
+                    required |= self._bits.setdefault(directive, 1 << len(self._bits))
+            self._entries.append((required, rule))
+
+    def __iter__(self):
+        return iter(self.rules)
+
+    def __len__(self):
+        return len(self.rules)
+
+    def execute(self, elem_list, fired=None):
+        """
+        Return a new elem_list produced by executing every rule in order. If fired is a list, the index of every
+        rule whose action was executed is appended to it.
+        """
+        elem_list = list(elem_list)  # the only copy: rules with an apply method permute it in place
+        present = self._presence(elem_list)
+        for index, (required, rule) in enumerate(self._entries):
+            if required & ~present:  # a required element is missing: the condition cannot be true
+                continue
+            if hasattr(rule, 'apply'):
+                changed = rule.apply(elem_list)
+            else:
+                result = rule.execute(elem_list)
+                changed = result is not elem_list
+                if changed:
+                    elem_list = list(result)
+            if changed:
+                present = self._presence(elem_list)
+                if fired is not None:
+                    fired.append(index)
+        return elem_list
+
+    def _presence(self, elem_list):
+        """
+        Return the bitset of the required directives found in elem_list
+        """
+        present = 0
+        for elem in elem_list:
+            present |= self._bits.get(elem.directive, 0)
+        return present
+
+
+def compile_rules(rules):
+    """
+    Return rules (a list of If or other objects with an execute method) as CompiledRules
+    """
+    if isinstance(rules, CompiledRules):
+        return rules
+    return CompiledRules(rules)
+
 
 class ConditionClause(object):
     """
@@ -34,6 +116,13 @@ class ConditionClause(object):
         """
         raise NotImplementedError()
 
+    def required_directives(self):
+        """
+        Return the set of directives of date elements that must all be found in the input for the condition to be
+        true. The set may be incomplete (an empty set makes no promise), but must not contain anything else.
+        """
+        return set()
+
 
 class ActionClause(object):
     """
@@ -44,7 +133,17 @@ class ActionClause(object):
         """
         Return a new instance of elem_list permuted by the action
         """
-        raise NotImplementedError()
+        copy = list(elem_list)
+        self.apply(copy)
+        return copy
+
+    def apply(self, elem_list):
+        """
+        Permute the list elem_list in place. Inheriting classes implement act, apply or both.
+        """
+        if type(self).act is ActionClause.act:
+            raise NotImplementedError()
+        elem_list[:] = self.act(elem_list)
 
 
 class And(ConditionClause):
@@ -60,6 +159,12 @@ class And(ConditionClause):
                 return False
         return True
 
+    def required_directives(self):
+        required = set()
+        for clause in self.clauses:
+            required.update(clause.required_directives())
+        return required
+
 
 class Contains(ConditionClause):
     """
@@ -75,6 +180,9 @@ class Contains(ConditionClause):
                 return False
         return True
 
+    def required_directives(self):
+        return set([requirement.directive for requirement in self.requirements])
+
 
 class Duplicate(ConditionClause):
     """
@@ -86,6 +194,9 @@ class Duplicate(ConditionClause):
     def is_true(self, elem_list):
         return elem_list.count(self.elem) > 1
 
+    def required_directives(self):
+        return set([self.elem.directive])
+
 
 class KeepOriginal(object):
     """
@@ -121,6 +232,9 @@ class Next(ConditionClause):
                     return True
         return False
 
+    def required_directives(self):
+        return set([self.a_elem.directive, self.b_elem.directive])
+
 
 class Sequence(ConditionClause):
     """
@@ -129,22 +243,55 @@ class Sequence(ConditionClause):
 
     Wild cards:
     . (period): Any single date element (including Filler)
+
+    The sequence is searched for in a single pass: a partial match is abandoned, without looking at the mismatching
+    element again, as soon as an element does not match the next entry. The rules in RULES are written for this
+    behavior (e.g. '.' in [MonthNum, '.', Hour24] never starts over at the second of two month numbers).
     """
 
     def __init__(self, *sequence):
         self.sequence = sequence
+        self._masks = {}  # directive -> bitmask of the sequence entries matched by elements with that directive
 
     def is_true(self, elem_list):
-        seq_pos = 0  # if we find every element in sequence (pos == length(self.sequence), then a match is found
+        return self.search(elem_list) >= 0
 
-        for elem in elem_list:
-            if self.match(elem, self.sequence[seq_pos]):
+    def required_directives(self):
+        return set([seq_expr.directive for seq_expr in self.sequence if type(seq_expr) is not str])
+
+    def search(self, elem_list):
+        """
+        Return the first position in elem_list where the sequence starts, or -1 if it is not found
+        """
+        if not self.sequence:
+            return 0
+
+        length = len(self.sequence)
+        seq_pos = 0  # number of entries of the sequence matched by the elements before the current one
+        for index, elem in enumerate(elem_list):
+            if self._mask(elem) >> seq_pos & 1:
                 seq_pos += 1
-                if seq_pos == len(self.sequence):
-                    return True
+                if seq_pos == length:
+                    return index - length + 1
             else:
                 seq_pos = 0  # reset if we exit sequence
-        return False
+        return -1
+
+    def _mask(self, elem):
+        """
+        Return the bitmask of the entries of the sequence that elem matches
+        """
+        try:
+            return self._masks[elem.directive]
+        except KeyError:
+            mask = 0
+            for index, seq_expr in enumerate(self.sequence):
+                if self.match(elem, seq_expr):
+                    mask |= 1 << index
+            if len(self._masks) >= 256:  # every filler text has its own directive, so bound the memo
+                self._masks.clear()
+            self._masks[elem.directive] = mask
+            return mask
 
     @staticmethod
     def match(elem, seq_expr):
@@ -168,15 +315,16 @@ class Sequence(ConditionClause):
         """
         Return the first position in elem_list where find_seq starts
         """
-        seq_pos = 0
-        for index, elem in enumerate(elem_list):
-            if Sequence.match(elem, find_seq[seq_pos]):
-                seq_pos += 1
-                if seq_pos == len(find_seq):  # found matching sequence
-                    return index - seq_pos + 1
-            else:  # exited sequence
-                seq_pos = 0
-        raise LookupError('Failed to find sequence in elem_list')
+        return Sequence(*find_seq).index(elem_list)
+
+    def index(self, elem_list):
+        """
+        Return the first position in elem_list where the sequence starts. Raises LookupError if it is not found.
+        """
+        start_pos = self.search(elem_list)
+        if start_pos < 0:
+            raise LookupError('Failed to find sequence in elem_list')
+        return start_pos
 
 
 class Swap(ActionClause):
@@ -186,13 +334,11 @@ class Swap(ActionClause):
 
     def __init__(self, remove_me, insert_me):
         self.remove_me = remove_me
-        self.insert_me = insert_me
+        self.insert_me = as_element(insert_me)
 
-    def act(self, elem_list):
-        copy = elem_list[:]
-        pos = copy.index(self.remove_me)
-        copy[pos] = self.insert_me
-        return copy
+    def apply(self, elem_list):
+        pos = elem_list.index(self.remove_me)
+        elem_list[pos] = self.insert_me
 
 
 class SwapDuplicateWhereSequenceNot(ActionClause):
@@ -201,24 +347,23 @@ class SwapDuplicateWhereSequenceNot(ActionClause):
     """
     def __init__(self, remove_me, insert_me, seq):
         self.remove_me = remove_me
-        self.insert_me = insert_me
+        self.insert_me = as_element(insert_me)
         self.seq = seq
+        self._sequence = Sequence(*seq)
 
-    def act(self, elem_list):
-        copy = elem_list[:]
-
-        start_pos = Sequence.find(self.seq, copy)
+    def apply(self, elem_list):
+        start_pos = self._sequence.index(elem_list)
         end_pos = start_pos + len(self.seq)  # do not replace within [start_pos, end_pos)
 
-        for index, elem in enumerate(copy):
+        for index, elem in enumerate(elem_list):
             if start_pos <= index < end_pos:  # within sequence
                 continue
             else:  # outside of sequence
                 if elem == self.remove_me:
-                    copy[index] = self.insert_me
-                    return copy
+                    elem_list[index] = self.insert_me
+                    return
 
-        raise LookupError('Failed to find element {0} to replace with {1} in {2} ignoring {3} between [{4},{5})'.format(self.remove_me, self.insert_me, copy, self.seq, start_pos, end_pos))
+        raise LookupError('Failed to find element {0} to replace with {1} in {2} ignoring {3} between [{4},{5})'.format(self.remove_me, self.insert_me, elem_list, self.seq, start_pos, end_pos))
 
 
 class SwapSequence(ActionClause):
@@ -227,18 +372,16 @@ class SwapSequence(ActionClause):
     """
     def __init__(self, find_seq, swap_seq):
         self.find_seq = find_seq
-        self.swap_seq = swap_seq
+        self.swap_seq = [r if r is KeepOriginal or r is None else as_element(r) for r in swap_seq]
+        self._sequence = Sequence(*find_seq)
+        self._deletes = any(r is None for r in swap_seq)
 
-    def act(self, elem_list):
-        copy = elem_list[:]
-
-        start_pos = Sequence.find(self.find_seq, copy)
+    def apply(self, elem_list):
+        start_pos = self._sequence.index(elem_list)
         for index, replacement in enumerate(self.swap_seq):
             if replacement is not KeepOriginal:
-                copy[start_pos + index] = replacement
+                elem_list[start_pos + index] = replacement
 
         # If we intend to delete items, we put None in the swap_seq and then clean up the list here
-        while None in copy:
-            copy.remove(None)
-
-        return copy
+        if self._deletes:
+            elem_list[:] = [elem for elem in elem_list if elem is not None]
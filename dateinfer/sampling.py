@@ -0,0 +1,105 @@
+import collections
+import random
+from .streaming import StreamingInferrer
+
+
+SampleResult = collections.namedtuple('SampleResult', ['format', 'examined'])
+
+SAMPLE_METHODS = ('reservoir', 'stratified')
+
+
+def infer_sample(examples, method='reservoir', alt_rules=None, confidence=0.999, min_examples=100, chunk_size=100,
+                 reservoir_size=10000, strata=10, rng=None, locale=None):
+    """
+    Infer the date format of examples from a random sample that only grows while the result is uncertain.
+
+    Examples are drawn in random order, chunk_size at a time, into a StreamingInferrer until every token position is
+    settled (see StreamingInferrer), so a column whose probabilities are far from the 0.5 filler threshold and free
+    of near-ties is decided after a few hundred examples whatever its size.
+
+    method is one of:
+    reservoir: a uniform random sample. If examples is not a sequence, it is read once into a reservoir of
+        reservoir_size examples.
+    stratified: examples is split into strata contiguous blocks and every chunk draws evenly from each block, so
+        the sample covers the whole input even if the format changes along it.
+
+    alt_rules and locale are used as in infer.infer. Returns a SampleResult of the format and the number of
+    examples examined.
+    """
+    if method not in SAMPLE_METHODS:
+        raise ValueError('{0} is not a valid sample method; expected one of {1}'.format(method, SAMPLE_METHODS))
+    if rng is None:
+        rng = random.Random()
+
+    if method == 'reservoir':
+        if _is_sequence(examples):
+            sample = (examples[i] for i in _random_order(0, len(examples), rng))
+        else:
+            sample = _reservoir(examples, reservoir_size, rng)
+    else:
+        if not _is_sequence(examples):
+            examples = list(examples)
+        sample = (examples[i] for i in _stratified_order(len(examples), strata, rng))
+
+    inferrer = StreamingInferrer(alt_rules=alt_rules, confidence=confidence, min_examples=min_examples,
+                                 locale=locale)
+    examined = inferrer.consume(sample, chunk_size)
+    return SampleResult(inferrer.infer(), examined)
+
+
+def _is_sequence(examples):
+    """
+    Return True if examples supports len() and indexing
+    """
+    return hasattr(examples, '__len__') and hasattr(examples, '__getitem__')
+
+
+def _random_order(start, stop, rng):
+    """
+    Yield the integers in [start, stop) in random order without building the full permutation up front
+    """
+    size = stop - start
+    drawn = set()
+    while len(drawn) < size // 2:  # rejection is cheap while less than half of the range has been drawn
+        index = rng.randrange(start, stop)
+        if index not in drawn:
+            drawn.add(index)
+            yield index
+
+    rest = [index for index in range(start, stop) if index not in drawn]
+    rng.shuffle(rest)
+    for index in rest:
+        yield index
+
+
+def _reservoir(examples, size, rng):
+    """
+    Return a uniform random sample of at most size examples from the iterable examples, in random order
+    """
+    reservoir = []
+    for count, example in enumerate(examples):
+        if count < size:
+            reservoir.append(example)
+        else:
+            index = rng.randint(0, count)
+            if index < size:
+                reservoir[index] = example
+    rng.shuffle(reservoir)
+    return reservoir
+
+
+def _stratified_order(length, strata, rng):
+    """
+    Yield the integers in [0, length) by drawing in turn a random, not yet drawn integer from each of strata equal
+    blocks
+    """
+    strata = max(1, min(strata, length))
+    orders = [_random_order(s * length // strata, (s + 1) * length // strata, rng) for s in range(strata)]
+    while orders:
+        remaining = []
+        for order in orders:
+            for index in order:
+                yield index
+                remaining.append(order)
+                break
+        orders = remaining
@@ -0,0 +1,176 @@
+import json
+import os
+import queue
+import socketserver
+import stat
+import threading
+import time
+from .cache import FormatCache
+from .date_elements import timezone_names
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from .infer import infer
+
+
+class Batcher(object):
+    """
+    Runs inference requests from many threads on a single worker thread, in batches.
+
+    submit() queues a request and waits for its format. The worker takes every request queued within max_delay
+    seconds of the first one (up to max_batch) and infers them in turn with a shared cache.FormatCache, so the rules
+    are applied once for all the requests whose examples are tagged with the same date elements.
+    """
+
+    def __init__(self, max_batch=64, max_delay=0.005, cache_size=1024):
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.cache = FormatCache(cache_size)
+        self.batches = 0
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name='dateinfer-batcher')
+        self._worker.daemon = True
+        self._worker.start()
+
+    def submit(self, examples, locale=None):
+        """
+        Return the format of examples, as infer.infer(examples, locale=locale). Exceptions raised by infer are raised
+        here.
+        """
+        return self.submit_many([examples], locale)[0]
+
+    def submit_many(self, columns, locale=None):
+        """
+        Return the list of formats of every list of examples in columns, queued together so that they share a batch
+        """
+        requests = [[examples, locale, threading.Event(), None, None] for examples in columns]  # ..., result, error
+        for request in requests:
+            self._queue.put(request)
+        for request in requests:
+            request[2].wait()
+            if request[4] is not None:
+                raise request[4]
+        return [request[3] for request in requests]
+
+    def close(self):
+        """
+        Stop the worker thread once the queued requests are done
+        """
+        self._queue.put(None)
+        self._worker.join()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_delay
+            while batch[-1] is not None and len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get(timeout=max(deadline - time.monotonic(), 0)))
+                except queue.Empty:
+                    break
+
+            self.batches += 1
+            for request in batch:
+                if request is None:
+                    continue
+                try:
+                    request[3] = infer(request[0], cache=self.cache, locale=request[1])
+                except Exception as e:
+                    request[4] = e
+                request[2].set()
+            if batch[-1] is None:
+                return
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    """
+    POST /infer with a JSON object holding either "examples" (a list of strings) or "columns" (a list of lists or an
+    object of lists of strings), and optionally "locale". Responds with {"format": ...} or {"formats": ...}. A body
+    that is not JSON is read as one example per line.
+    """
+    server_version = 'dateinfer'
+
+    def do_POST(self):
+        if self.path.split('?')[0] != '/infer':
+            return self._respond(404, {'error': 'not found'})
+        try:
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0))).decode('utf-8')
+            try:
+                request = json.loads(body)
+            except ValueError:
+                request = {'examples': [line for line in body.splitlines() if line]}
+            if not isinstance(request, dict):
+                raise ValueError('expected a JSON object')
+
+            batcher = self.server.batcher
+            locale = request.get('locale')
+            if 'columns' in request:
+                columns = request['columns']
+                if isinstance(columns, dict):
+                    names = list(columns.keys())
+                    formats = dict(zip(names, batcher.submit_many([columns[name] for name in names], locale)))
+                else:
+                    formats = batcher.submit_many(columns, locale)
+                return self._respond(200, {'formats': formats})
+            return self._respond(200, {'format': batcher.submit(request['examples'], locale)})
+        except (KeyError, TypeError, ValueError) as e:
+            return self._respond(400, {'error': str(e)})
+
+    def do_GET(self):
+        if self.path.split('?')[0] != '/health':
+            return self._respond(404, {'error': 'not found'})
+        return self._respond(200, {'status': 'ok', 'cache': self.server.batcher.cache.info()._asdict()})
+
+    def address_string(self):
+        return self.client_address[0] if isinstance(self.client_address, tuple) else 'local'
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            BaseHTTPRequestHandler.log_message(self, format, *args)
+
+    def _respond(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class _ThreadingHTTPServer(socketserver.ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+if hasattr(socketserver, 'UnixStreamServer'):
+    class _ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+
+        def server_bind(self):
+            socketserver.UnixStreamServer.server_bind(self)
+            self.server_name = 'localhost'
+            self.server_port = 0
+
+
+def make_server(host='127.0.0.1', port=8000, socket_path=None, max_batch=64, max_delay=0.005, verbose=False):
+    """
+    Return an HTTP server (see _RequestHandler) listening on host and port, or on the Unix socket socket_path if
+    given, with a Batcher as its batcher attribute. A socket left at socket_path by a previous server is replaced;
+    raises FileExistsError if anything else is there. Timezone names and compiled rules are loaded before returning,
+    so the first request does not pay for them. Call serve_forever() to run it.
+    """
+    if socket_path is not None:
+        try:
+            mode = os.lstat(socket_path).st_mode
+        except FileNotFoundError:
+            pass
+        else:
+            if not stat.S_ISSOCK(mode):  # never remove anything but a stale socket
+                raise FileExistsError('{0} exists and is not a socket'.format(socket_path))
+            os.unlink(socket_path)
+        server = _ThreadingUnixHTTPServer(socket_path, _RequestHandler)
+    else:
+        server = _ThreadingHTTPServer((host, port), _RequestHandler)
+    server.batcher = Batcher(max_batch=max_batch, max_delay=max_delay)
+    server.verbose = verbose
+
+    timezone_names()
+    infer(['Mon Jan 13 09:52:52 MST 2014'])
+    return server
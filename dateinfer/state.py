@@ -0,0 +1,186 @@
+import collections
+import json
+from .infer import DATE_ELEMENTS, RULES, _CLASSIFIER, _choose_element, _format_string, _locale_tables, tokenize_many
+
+
+class InferenceState(object):
+    """
+    The statistics infer.infer computes from its examples, in a form that can be merged and serialized.
+
+    For every token length, the state counts the examples of that length and, for each token position, how often
+    every bitmask of matching date elements (see classifier.TokenClassifier) and every token was seen. finalize()
+    chooses the elements and applies the rules as infer does. Merging adds the counters, so states built from
+    shards of a dataset, merged in any order and grouping, finalize to the format of the whole dataset:
+
+    >>> states = [InferenceState.from_examples(shard) for shard in shards]  # on every node
+    >>> functools.reduce(InferenceState.merge, states).finalize()
+
+    Tokens are only kept for the filler text of positions no element matches often enough, so at most max_tokens
+    of them are kept per position: the most common ones, ties broken by the smaller token. The counts are exact as
+    long as fewer distinct tokens are seen, which is the case for the separators and words that become filler.
+
+    finalize() can differ from infer in two cases of ties, where infer keeps whichever was seen first and a state
+    does not know which one that was. finalize() takes the smallest instead, so that the result does not depend on
+    how the dataset was sharded and merged. When several token counts are equally common, infer tags the examples
+    of the first one seen: infer(['2014-01-11 10:00', '2014-01-12']) uses the examples of 9 tokens and returns
+    '%Y-%d-%m %m:%d', while finalize() uses those of 5 tokens and returns '%Y-%d-%m'. When several tokens are
+    equally common at a filler position, infer(['b 2014', 'a 2014']) returns 'b %Y' and finalize() 'a %Y'.
+    """
+
+    def __init__(self, locale=None, max_tokens=32):
+        """
+        locale selects the language of month and weekday names, as in infer.infer. Only states of the same locale
+        can be merged.
+        """
+        _locale_tables(locale)  # raise ValueError now for an unknown locale
+        self.locale = locale
+        self.max_tokens = max_tokens
+        self.examples = 0
+        self.lengths = collections.Counter()  # token length -> number of examples
+        self.positions = {}  # token length -> list of (Counter of bitmask, Counter of token), one per token position
+
+    def __repr__(self):
+        return '<InferenceState examples={0} lengths={1} locale={2!r}>'.format(self.examples, len(self.lengths),
+                                                                               self.locale)
+
+    def __eq__(self, other):
+        return isinstance(other, InferenceState) and self.to_dict() == other.to_dict()
+
+    def __ne__(self, other):
+        return not self == other
+
+    @classmethod
+    def from_examples(cls, examples, locale=None, max_tokens=32):
+        """
+        Return a new state holding the statistics of examples
+        """
+        state = cls(locale, max_tokens)
+        state.update(examples)
+        return state
+
+    def update(self, examples):
+        """
+        Add every example in examples (any iterable) to the state
+        """
+        classifier = _locale_tables(self.locale).classifier
+        tokenized_examples = tokenize_many(examples, self.locale)
+        self.examples += len(tokenized_examples)
+
+        by_length = collections.defaultdict(list)
+        for tokens in tokenized_examples:
+            by_length[len(tokens)].append(tokens)
+
+        for length, group in by_length.items():
+            self.lengths[length] += len(group)
+            for (masks, tokens), column in zip(self._positions_of(length), zip(*group)):
+                token_counts = collections.Counter(column)
+                masks.update(classifier.mask_counts(token_counts))
+                for token, n in token_counts.items():
+                    tokens[token if isinstance(token, str) else token.decode('utf-8', 'replace')] += n
+                self._prune(tokens)
+
+    def merge(self, other):
+        """
+        Return a new state holding the statistics of both self and other. Neither is modified.
+        """
+        if other.locale != self.locale:
+            raise ValueError('cannot merge states of locales {0!r} and {1!r}'.format(self.locale, other.locale))
+        merged = InferenceState(self.locale, max(self.max_tokens, other.max_tokens))
+        for state in (self, other):
+            merged.examples += state.examples
+            merged.lengths.update(state.lengths)
+            for length, positions in state.positions.items():
+                for (masks, tokens), (other_masks, other_tokens) in zip(merged._positions_of(length), positions):
+                    masks.update(other_masks)
+                    tokens.update(other_tokens)
+                    merged._prune(tokens)
+        return merged
+
+    __add__ = merge
+
+    def finalize(self, alt_rules=None):
+        """
+        Return the datetime.strptime-compliant format string infer.infer would return for the examples added to
+        the state (or to the states merged into it), except for ties between token lengths or filler texts (see
+        InferenceState). alt_rules replaces the default RULES.
+        """
+        date_classes = []
+        if self.lengths:
+            # the most common token length, the smaller winning ties (infer keeps the one seen first)
+            length = min(self.lengths.items(), key=lambda item: (-item[1], item[0]))[0]
+            for masks, tokens in self.positions[length]:
+                total = float(sum(masks.values()))
+                probabilities = tuple([m / total for m in _CLASSIFIER.count_masks(masks)])
+                date_classes.append(_choose_element(probabilities, lambda: _most_common(tokens)[0][0]))
+
+        return _format_string(date_classes, alt_rules if alt_rules else RULES)
+
+    def to_dict(self):
+        """
+        Return the state as a dict of JSON-compatible values (see from_dict)
+        """
+        return {
+            'elements': [elem.directive for elem in DATE_ELEMENTS],
+            'locale': self.locale,
+            'max_tokens': self.max_tokens,
+            'examples': self.examples,
+            'positions': dict([(str(length), [[dict([(str(mask), n) for mask, n in masks.items()]), dict(tokens)]
+                                              for masks, tokens in self.positions[length]])
+                               for length in self.lengths]),
+            'lengths': dict([(str(length), n) for length, n in self.lengths.items()]),
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        """
+        Return the state serialized by to_dict. Raises ValueError if it was built with different date elements.
+        """
+        if d['elements'] != [elem.directive for elem in DATE_ELEMENTS]:
+            raise ValueError('state was built with different date elements')
+        state = cls(d['locale'], d['max_tokens'])
+        state.examples = d['examples']
+        state.lengths.update(dict([(int(length), n) for length, n in d['lengths'].items()]))
+        for length, positions in d['positions'].items():
+            state.positions[int(length)] = [(collections.Counter(dict([(int(mask), n) for mask, n in masks.items()])),
+                                             collections.Counter(tokens)) for masks, tokens in positions]
+        return state
+
+    def to_json(self):
+        """
+        Return the state as a compact JSON string (see from_json)
+        """
+        return json.dumps(self.to_dict(), separators=(',', ':'), sort_keys=True)
+
+    @classmethod
+    def from_json(cls, s):
+        """
+        Return the state serialized by to_json
+        """
+        return cls.from_dict(json.loads(s))
+
+    def _positions_of(self, length):
+        """
+        Return the list of per-position counters for token length, creating it if needed
+        """
+        positions = self.positions.get(length)
+        if positions is None:
+            positions = self.positions[length] = [(collections.Counter(), collections.Counter())
+                                                  for _ in range(length)]
+        return positions
+
+    def _prune(self, tokens):
+        """
+        Keep only the max_tokens most common tokens of the Counter tokens
+        """
+        if len(tokens) > self.max_tokens:
+            kept = _most_common(tokens)[:self.max_tokens]
+            tokens.clear()
+            tokens.update(dict(kept))
+
+
+def _most_common(tokens):
+    """
+    Return the (token, count) pairs of the Counter tokens, most common first, ties broken by the smaller token so
+    that the order does not depend on the order tokens were counted or states merged in
+    """
+    return sorted(tokens.items(), key=lambda item: (-item[1], item[0]))
@@ -0,0 +1,43 @@
+import collections
+
+
+class InferenceStats(object):
+    """
+    Instrumentation for infer, passed as infer(examples, stats=InferenceStats()).
+
+    Counters and timings accumulate over every call the object is passed to:
+    calls, examples, dropped (examples ignored because their token count differs from the most common one),
+    cache_hits, tokenize_seconds, tag_seconds, rewrite_seconds and rules_fired (a Counter of the index in the rule
+    list of every rule whose action was executed).
+
+    positions describes the most recent call that tagged examples: for every token position, a dict of the directive
+    of every date element that matched any token at that position to the fraction of tokens it matched.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.examples = 0
+        self.dropped = 0
+        self.cache_hits = 0
+        self.tokenize_seconds = 0.0
+        self.tag_seconds = 0.0
+        self.rewrite_seconds = 0.0
+        self.rules_fired = collections.Counter()
+        self.positions = []
+
+    def __repr__(self):
+        return '<InferenceStats calls={0} examples={1} dropped={2} seconds={3:.6f}>'.format(
+            self.calls, self.examples, self.dropped, self.total_seconds())
+
+    def fired_rules(self, rules):
+        """
+        Return the rules of the rule list rules (RULES unless alt_rules were given to infer) that fired, in order
+        """
+        rules = list(rules)
+        return [rules[index] for index in sorted(self.rules_fired)]
+
+    def total_seconds(self):
+        """
+        Return the time spent in tokenizing, tagging and rewriting
+        """
+        return self.tokenize_seconds + self.tag_seconds + self.rewrite_seconds
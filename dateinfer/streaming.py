@@ -0,0 +1,150 @@
+import collections
+import itertools
+import math
+from .infer import DATE_ELEMENTS, RULES, _format_string, _locale_tables, _position_probabilities, _tag_position, \
+    tokenize_many
+
+
+class StreamingInferrer(object):
+    """
+    Infers the date format of a stream of examples incrementally.
+
+    Instead of keeping the examples, the inferrer keeps a histogram of token lengths and, for every token length, a
+    Counter of the tokens found at each position. infer() may be called at any point and returns the format that
+    infer.infer would return for all of the examples added so far.
+
+    A position is settled once its winning element leads every other element, and the 0.5 filler threshold, by more
+    than a Hoeffding bound for the number of examples seen (at the requested confidence, shared between all
+    positions and elements). consume() stops reading its input once the most common token length and every position
+    of that length are settled.
+    """
+
+    def __init__(self, alt_rules=None, confidence=0.999, min_examples=100, locale=None):
+        """
+        alt_rules replaces the default RULES and locale selects the language of month and weekday names, as in
+        infer.infer. No early stop happens before min_examples examples have been seen.
+        """
+        self.alt_rules = alt_rules
+        self.locale = locale
+        self._classifier = _locale_tables(locale).classifier
+        self.confidence = confidence
+        self.min_examples = min_examples
+        self.examples_seen = 0
+        self._lengths = collections.Counter()
+        self._positions = {}  # token length -> list of Counters of tokens, one per token position
+
+    def update(self, example):
+        """
+        Add a single example
+        """
+        self.update_many([example])
+
+    def update_many(self, examples):
+        """
+        Add every example in examples (any iterable)
+        """
+        tokenized_examples = tokenize_many(examples, self.locale)
+        self._lengths.update([len(e) for e in tokenized_examples])
+        self.examples_seen += len(tokenized_examples)
+
+        by_length = collections.defaultdict(list)
+        for example in tokenized_examples:
+            by_length[len(example)].append(example)
+
+        for length, group in by_length.items():
+            if length not in self._positions:
+                self._positions[length] = [collections.Counter() for _ in range(length)]
+            for counter, tokens in zip(self._positions[length], zip(*group)):
+                counter.update(tokens)
+
+    def consume(self, iterable, chunk_size=100):
+        """
+        Add examples from iterable, chunk_size at a time, until the format is settled or iterable is exhausted.
+        Examples after the last chunk read are left in the iterator. Returns the number of examples read.
+        """
+        iterator = iter(iterable)
+        consumed = 0
+        while not self.is_settled():
+            chunk = list(itertools.islice(iterator, chunk_size))
+            if not chunk:
+                break
+            self.update_many(chunk)
+            consumed += len(chunk)
+        return consumed
+
+    def infer(self):
+        """
+        Return the datetime.strptime-compliant format string for the examples seen so far
+        """
+        date_classes = [_tag_position(c, self._classifier) for c in self._mode_positions()]
+
+        if self.alt_rules:
+            return _format_string(date_classes, self.alt_rules)
+        else:
+            return _format_string(date_classes, RULES)
+
+    def is_settled(self):
+        """
+        Return True if more examples are unlikely to change the result of infer()
+        """
+        if self.examples_seen == 0 or self.examples_seen < self.min_examples:
+            return False
+
+        positions = self._mode_positions()
+        comparisons = (len(positions) * len(DATE_ELEMENTS)) + 1
+        delta = (1.0 - self.confidence) / comparisons
+
+        if not _has_safe_lead(self._lengths, self.examples_seen, _hoeffding_margin(self.examples_seen, delta)):
+            return False
+
+        total = sum(positions[0].values()) if positions else 0
+        margin = _hoeffding_margin(total, delta)
+        for token_counts in positions:
+            if not _is_position_settled(token_counts, total, margin, self._classifier):
+                return False
+        return True
+
+    def _mode_positions(self):
+        """
+        Return the token Counters for the most common token length (ties are broken as in infer._mode)
+        """
+        if not self._lengths:
+            return []
+        return self._positions[self._lengths.most_common(1)[0][0]]
+
+
+def _has_safe_lead(counter, total, margin):
+    """
+    Return True if the most common key of counter leads the second most common by more than margin (a fraction of
+    total)
+    """
+    top = counter.most_common(2)
+    runner_up = top[1][1] if len(top) > 1 else 0
+    return float(top[0][1] - runner_up) / total > margin
+
+
+def _hoeffding_margin(n, delta):
+    """
+    Return the deviation of an observed frequency over n samples from its true value that is exceeded with
+    probability at most delta
+    """
+    return math.sqrt(math.log(2.0 / delta) / (2.0 * n))
+
+
+def _is_position_settled(token_counts, total, margin, classifier):
+    """
+    Return True if the element chosen by infer._tag_position for token_counts is safe given margin.
+
+    Elements tied exactly with the winner are not a risk: they matched the very same tokens in every example seen, so
+    a token telling them apart would have been seen with high probability if such tokens were common.
+    """
+    probabilities = _position_probabilities(token_counts, classifier)
+    max_prob = max(probabilities)
+    if abs(max_prob - 0.5) <= margin:
+        return False
+    if max_prob < 0.5:  # filler: the filler text itself must be stable
+        return _has_safe_lead(token_counts, total, margin)
+    for prob in probabilities:
+        if prob != max_prob and max_prob - prob <= margin:
+            return False
+    return True
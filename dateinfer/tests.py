@@ -1,8 +1,29 @@
 import unittest
+from io import StringIO
 from dateinfer.date_elements import *
-import infer
-import ruleproc
+import asyncio
+import concurrent.futures
+import datetime
+import importlib
+import itertools
+import json
+import os
+import pickle
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import urllib.error
+import urllib.request
 import yaml
+from dateinfer import asynchronous, benchmarks, cache, classifier, cli, columns, date_elements, files, inferrer, \
+    locales, locate, parsing, ruleproc, sampling, server, state, stats, streaming
+
+infer = importlib.import_module('dateinfer.infer')  # dateinfer.infer is the function infer
+
+_EXAMPLES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'examples.yaml')
 
 
 def load_tests(loader, standard_tests, ignored):
@@ -12,7 +33,7 @@ def load_tests(loader, standard_tests, ignored):
     suite = unittest.TestSuite()
     suite.addTests(standard_tests)
 
-    with open('examples.yaml', 'r') as f:
+    with open(_EXAMPLES_PATH, 'r') as f:
         examples = yaml.safe_load_all(f)
         for example in examples:
             suite.addTest(test_case_for_example(example))
@@ -56,6 +77,711 @@ class TestAmbiguousDateCases(unittest.TestCase):
         self.assertIn(infer.infer(['04/12/2012', '05/12/2012', '06/12/2012', '07/12/2012']),
                       ['%d/%m/%Y', '%m/%d/%Y'])
 
+    def testDayMonthWithTime(self):
+        # days and months are all <= 12; the rules once tagged the hours as days as well ('%Y-%d-%m %d:%M:%S')
+        for examples, formats in [(['2014-01-01 00:00:00', '2014-01-01 10:11:12', '2014-01-02 11:30:00'],
+                                   ['%Y-%m-%d %H:%M:%S', '%Y-%d-%m %H:%M:%S']),
+                                  (['2015-03-03T19:33:00', '2015-03-04T19:33:00'],
+                                   ['%Y-%m-%dT%H:%M:%S', '%Y-%d-%mT%H:%M:%S'])]:
+            actual = infer.infer(examples)
+            self.assertIn(actual, formats)
+            self.assertEqual(1, actual.count('%d'), actual)
+
+
+class TestAsyncInferrer(unittest.TestCase):
+    iso = ['2014-01-11', '2014-11-01', '1990-05-05', '2013-12-13']
+    us = ['12/31/1999', '11/11/1911', '5/9/1981', '6/3/1985']
+
+    def setUp(self):
+        self.executor = concurrent.futures.ThreadPoolExecutor(1)
+
+    def tearDown(self):
+        self.executor.shutdown()
+
+    def testCoalesce(self):
+        inferrer = asynchronous.AsyncInferrer(executor=self.executor)
+        columns = [self.iso] * 10 + [self.us] * 3
+
+        actual = asyncio.run(inferrer.infer_many(columns))
+        self.assertListEqual([infer.infer(examples) for examples in columns], actual)
+        self.assertEqual(2, inferrer.computed)
+        self.assertEqual(11, inferrer.coalesced)
+
+    def testFillerNotCoalesced(self):
+        inferrer = asynchronous.AsyncInferrer(executor=self.executor)
+        columns = [['1 x', 'x x', 'y x'], ['2 x', 'x x', 'y x']]
+
+        self.assertListEqual(['1 x', '2 x'], asyncio.run(inferrer.infer_many(columns)))
+        self.assertEqual(2, inferrer.computed)
+
+    def testCancelledRequest(self):
+        gate = threading.Event()
+
+        class GatedExecutor(concurrent.futures.ThreadPoolExecutor):
+            def submit(self, fn, *args):
+                if fn is asynchronous._infer:  # hold the inference until the first request is cancelled
+                    return super(GatedExecutor, self).submit(lambda: gate.wait() and fn(*args))
+                return super(GatedExecutor, self).submit(fn, *args)
+
+        executor = GatedExecutor(2)
+        inferrer = asynchronous.AsyncInferrer(executor=executor)
+
+        async def run():
+            first = asyncio.ensure_future(inferrer.infer(self.iso))
+            second = asyncio.ensure_future(inferrer.infer(list(self.iso)))
+            while inferrer.coalesced == 0:
+                await asyncio.sleep(0.001)
+            first.cancel()
+            gate.set()
+            return await second
+
+        try:
+            self.assertEqual('%Y-%m-%d', asyncio.run(run()))
+            self.assertEqual(1, inferrer.computed)
+        finally:
+            gate.set()
+            executor.shutdown()
+
+    def testInferAsync(self):
+        async def run():
+            return await asyncio.gather(asynchronous.infer_async(self.iso),
+                                        asynchronous.infer_async(['3 février 2014', '14 août 2013'], locale='fr'))
+
+        self.assertListEqual(['%Y-%m-%d', infer.infer(['3 février 2014', '14 août 2013'], locale='fr')],
+                             asyncio.run(run()))
+        self.assertRaises(ValueError, asynchronous.AsyncInferrer, max_concurrency=0)
+
+
+class TestBenchmarks(unittest.TestCase):
+    def testRun(self):
+        cases = [('ISO', ['2014-01-11', '2014-11-01']), ('US', ['12/31/1999', '5/9/1981'])]
+        results = benchmarks.run(sizes=[10], cases=cases, repeat=1, columns=3)
+
+        stages = [(r['case'], r['stage']) for r in results['results']]
+        expected = [(name, stage) for name in ['ISO', 'US', 'long lines: ISO'] for stage in benchmarks.STAGES]
+        self.assertListEqual(expected + [('many columns: 3', 'infer_columns')], stages)
+        self.assertTrue(all([r['rows'] == 10 and r['seconds'] >= 0 and r['peak_bytes'] > 0
+                             for r in results['results']]))
+
+        slower = {'results': [dict(r, seconds=r['seconds'] * 2 + 1) for r in results['results']]}
+        self.assertEqual([], benchmarks.compare(results, results))
+        self.assertEqual(len(stages), len(benchmarks.compare(results, slower)))
+
+    def testLoadCases(self):
+        cases = benchmarks.load_cases()
+
+        self.assertIn(('ISO 8601 (date only)', ['2014-01-11', '2014-11-01', '1990-05-05', '2013-12-13']), cases)
+
+
+class TestColumns(unittest.TestCase):
+    def setUp(self):
+        self.columns = {
+            'created': ['2014-01-11', '2014-11-01', '1990-05-05', '2013-12-13'],
+            'updated': ['Mon Jan 13 09:52:52 MST 2014', 'Tue Jan 21 15:30:00 EST 2014'],
+            'birthday': ['12/31/1999', '11/11/1911', '5/9/1981', '6/3/1985'],
+        }
+
+    def testInline(self):
+        actual = columns.infer_columns(self.columns, workers=1)
+
+        self.assertSetEqual(set(self.columns.keys()), set(actual.keys()))
+        for name, examples in self.columns.items():
+            self.assertEqual(infer.infer(examples), actual[name].format)
+            self.assertEqual(len(examples), actual[name].examined)
+            self.assertGreaterEqual(actual[name].seconds, 0.0)
+
+    def testPool(self):
+        values = list(self.columns.values())
+        actual = columns.infer_columns(values, workers=2)
+
+        self.assertListEqual([infer.infer(examples) for examples in values], [r.format for r in actual])
+
+    def testSampleSize(self):
+        examples = ['2014-01-{0:02d}'.format(day) for day in range(1, 29)] * 100
+        actual = columns.infer_columns([examples, iter(examples)], workers=1, sample_size=50, seed=1)
+
+        self.assertListEqual([('%Y-%m-%d', 50)] * 2, [(r.format, r.examined) for r in actual])
+        sample = columns._sample(range(10 ** 9), 10, random.Random(1))  # drawn by index
+        self.assertEqual(10, len(set(sample)))
+
+
+class TestCompiledParser(unittest.TestCase):
+    def testMatchesStrptime(self):
+        cases = [('%Y-%m-%d %H:%M:%S', ['2014-01-11 10:00:59', '1999-12-31 23:59:09']),
+                 ('%d %B %Y', ['3 August 2009', '28 february 1990']),
+                 ('%m/%d/%y %I:%M %p', ['4/30/98 4:52 pm', '12/01/14 12:05 AM']),
+                 ('%A, %b %d, %Y', ['Tuesday, Aug 03, 2009']),
+                 ('%Y-%m-%dT%H:%M:%S%z', ['2014-01-11T10:00:00+0530', '2014-01-11T10:00:00-08:00']),
+                 ('%d.%m.%Y %H%%', ['1.2.2014  5%'])]
+        for fmt, values in cases:
+            parser = parsing.compile_parser(fmt)
+            for value in values:
+                self.assertEqual(datetime.datetime.strptime(value, fmt), parser.parse(value))
+
+    def testInferredFormat(self):
+        examples = ['Mon Jan 13 09:52:52 UTC 2014', 'Tue Jan 21 15:30:00 GMT 2014']
+        parser = parsing.compile_parser(infer.infer(examples))
+
+        self.assertListEqual([datetime.datetime(2014, 1, 13, 9, 52, 52), datetime.datetime(2014, 1, 21, 15, 30)],
+                             parser.parse_many(examples))
+
+    def testInvalid(self):
+        parser = parsing.compile_parser('%Y-%m-%d')
+
+        self.assertRaises(ValueError, parser.parse, '2014-02-30')
+        self.assertRaises(ValueError, parser.parse, '2014-01-11 10:00')
+        self.assertRaises(ValueError, parser.parse_many, ['2014-01-11', 'x'])
+        self.assertListEqual([datetime.datetime(2014, 1, 11), None, None],
+                             parser.parse_many(['2014-01-11', 'x', '2014-13-01'], errors='coerce'))
+        self.assertRaises(ValueError, parser.parse_many, [], errors='ignore')
+        self.assertRaises(ValueError, parsing.compile_parser, '%Y-%j')
+        self.assertRaises(ValueError, parsing.compile_parser, '%Y%')
+
+
+class TestCompiledRules(unittest.TestCase):
+    def testExecute(self):
+        rules = [ruleproc.If(ruleproc.Contains(MonthNum, MonthTextLong), ruleproc.Swap(MonthNum, DayOfMonth)),
+                 ruleproc.If(ruleproc.Duplicate(MonthNum), ruleproc.Swap(MonthNum, DayOfMonth))]
+        compiled = ruleproc.compile_rules(rules)
+
+        self.assertEqual(2, len(compiled))
+        self.assertListEqual(rules, list(compiled))
+        self.assertIs(compiled, ruleproc.compile_rules(compiled))
+        self.assertListEqual([DayOfMonth(), Filler(' '), MonthTextLong()],
+                             compiled.execute([MonthNum(), Filler(' '), MonthTextLong()]))
+        self.assertListEqual([DayOfMonth(), Filler('/'), MonthNum()],
+                             compiled.execute([MonthNum(), Filler('/'), MonthNum()]))
+
+    def testSkipsRulesWithMissingElements(self):
+        class Never(ruleproc.ConditionClause):
+            def is_true(self, elem_list):
+                raise AssertionError('condition should have been skipped')
+
+            def required_directives(self):
+                return set(['%B'])
+
+        compiled = ruleproc.compile_rules([ruleproc.If(Never(), ruleproc.Swap(MonthNum, DayOfMonth))])
+        elem_list = [MonthNum(), Filler('/'), DayOfMonth()]
+
+        self.assertListEqual(elem_list, compiled.execute(elem_list))
+
+    def testRulesMatchInfer(self):
+        examples = ['Mon Jan 13 09:52:52 MST 2014', 'Tue Jan 21 15:30:00 EST 2014']
+
+        self.assertEqual(infer.infer(examples), infer.infer(examples, alt_rules=ruleproc.compile_rules(infer.RULES)))
+
+
+class TestDateElements(unittest.TestCase):
+    def testInterned(self):
+        self.assertIs(MonthNum(), MonthNum())
+        self.assertEqual(Filler(':'), Filler(':'))
+        self.assertNotEqual(Filler(':'), Filler('/'))
+        self.assertEqual('%%', Filler('%').directive)
+        self.assertEqual(hash(MonthNum()), hash(MonthNum()))
+        self.assertEqual(2, len(set([MonthNum(), DayOfMonth(), MonthNum()])))
+        self.assertRaises(AttributeError, setattr, MonthNum(), 'extra', 1)
+
+    def testPickle(self):
+        self.assertIs(Year4(), pickle.loads(pickle.dumps(Year4())))
+        self.assertEqual('%%', pickle.loads(pickle.dumps(Filler('%'))).directive)
+
+    def testNameTable(self):
+        table = NameTable(['', 'Janvier', 'Février'], ['', 'janv.', 'févr.'], ['Lundi'], ['lun.'], fold_case=True)
+
+        self.assertTrue(table.contains('%B', 'FÉVRIER'))
+        self.assertTrue(table.contains('%b', 'Janv.'))
+        self.assertFalse(table.contains('%B', ''))
+        self.assertFalse(table.contains('%A', 'Monday'))
+        self.assertEqual(('', 'Janvier', 'Février'), table.names('%B'))
+        self.assertFalse(NameTable.from_calendar().contains('%b', 'JAN'))
+
+    def testRefreshNames(self):
+        try:
+            self.assertFalse(MonthTextShort().is_match('JAN'))
+            self.assertTrue(refresh_names(fold_case=True).fold_case)
+            self.assertTrue(MonthTextShort().is_match('JAN'))
+            self.assertTrue(WeekdayLong().is_match('saturday'))
+        finally:
+            refresh_names()
+        self.assertFalse(MonthTextShort().is_match('JAN'))
+
+    def testTimezoneSource(self):
+        try:
+            for source in TIMEZONE_SOURCES:
+                set_timezone_source(source)
+                self.assertTrue(Timezone().is_match('UTC'))
+                self.assertTrue(Timezone().is_match('EST'))
+                self.assertFalse(Timezone().is_match('Jan'))
+                self.assertIn('US/Eastern', timezone_names())
+            self.assertRaises(ValueError, set_timezone_source, 'tzdata')
+        finally:
+            set_timezone_source(None)
+
+    def testTimezoneNamesLoadedLazily(self):
+        set_timezone_source(None)
+        self.assertFalse(Timezone().is_match('-'))
+        self.assertFalse(Timezone().is_match('2014'))
+        self.assertIsNone(date_elements._TIMEZONE_NAMES)
+
+
+class TestFiles(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'export.csv')
+        with open(self.path, 'w') as f:
+            f.write('id,name,created,note\n')
+            for i in range(5000):
+                f.write('{0},user {0},2014-{1:02d}-{2:02d} {3:02d}:{4:02d},"a, ""quoted""\nnote"\n'.format(
+                    i, i % 12 + 1, i % 28 + 1, i % 24, i % 60))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def testColumns(self):
+        actual = files.infer_file(self.path, columns=['created'])
+
+        self.assertListEqual([('created', '%Y-%m-%d %H:%M')], list(actual.items()))
+
+    def testDiscoverColumns(self):
+        actual = files.infer_file(self.path)
+
+        self.assertEqual('%Y-%m-%d %H:%M', actual['created'])
+        self.assertNotIn('name', actual)
+        self.assertNotIn('note', actual)
+
+    def testQuoteInUnquotedField(self):
+        with open(self.path, 'w') as f:
+            f.write('id,size,created\n')
+            for i in range(500):
+                f.write('{0},{1}" screen,2014-{2:02d}-{3:02d}\n'.format(i, i % 20, i % 12 + 1, i % 28 + 1))
+
+        self.assertEqual('%Y-%m-%d', files.infer_file(self.path, columns=['created'])['created'])
+
+    def testNoHeader(self):
+        actual = files.infer_file(self.path, columns=[2], header=False)
+
+        self.assertEqual('%Y-%m-%d %H:%M', actual[2])
+
+    def testCommandLine(self):
+        stdout = sys.stdout
+        sys.stdout = output = StringIO()
+        try:
+            status = cli.main(['file', self.path, '--columns', 'created'])
+        finally:
+            sys.stdout = stdout
+
+        self.assertEqual(0, status)
+        self.assertEqual('created\t%Y-%m-%d %H:%M\n', output.getvalue())
+
+    def testMmap(self):
+        path = os.path.join(self.directory, 'timestamps.txt')
+        with open(path, 'wb') as f:
+            for i in range(500):
+                f.write('{0:02d}/{1:02d}/2014 {2:02d}:{3:02d}\r\n\n'.format(i % 12 + 1, i % 28 + 1, i % 24, i % 60)
+                        .encode('ascii'))
+        self.assertEqual('%m/%d/%Y %H:%M', files.infer_mmap(path))
+
+        with open(path, 'wb') as f:
+            f.write(u'14 f\xe9vrier 2014\n30 mars 2014'.encode('utf-8'))
+        self.assertEqual('%d %B %Y', files.infer_mmap(path, locale='fr'))
+
+        open(path, 'w').close()
+        self.assertEqual('', files.infer_mmap(path))
+
+    def testMmapError(self):
+        path = os.path.join(self.directory, 'timestamps.txt')
+        with open(path, 'wb') as f:
+            f.write(b'01/02/2014\n' * 50)
+
+        class FailingInferrer(streaming.StreamingInferrer):
+            def update_many(self, examples):
+                raise KeyError('failed')
+
+        files.StreamingInferrer = FailingInferrer
+        try:
+            with self.assertRaises(KeyError):  # not BufferError from closing the map
+                files.infer_mmap(path)
+        finally:
+            files.StreamingInferrer = streaming.StreamingInferrer
+
+
+class TestFormatCache(unittest.TestCase):
+    def testHitsAndMisses(self):
+        c = cache.FormatCache(maxsize=2)
+
+        self.assertEqual('%Y-%m-%d', infer.infer(['2014-01-13', '2013-12-14'], cache=c))
+        self.assertEqual('%Y-%m-%d', infer.infer(['1990-05-15', '2014-11-16'], cache=c))
+        self.assertEqual((1, 1, 0, 2, 1), c.info())
+
+        self.assertEqual('%m/%d/%Y', infer.infer(['8/13/2004'], cache=c))
+        self.assertEqual('%d/%m/%Y', infer.infer(['13/1/2012'], cache=c))
+        self.assertEqual((1, 3, 1, 2, 2), c.info())
+
+    def testKeyedByElements(self):
+        c = cache.FormatCache()
+        examples = ['04/12/2012', '05/12/2012', '06/12/2012', '07/12/2012', '13/12/2012']
+
+        for batch in (examples, examples * 2, examples[-1:] * 3 + examples[:1]):  # all tagged %d / %m / %Y
+            self.assertEqual(infer.infer(batch), infer.infer(batch, cache=c))
+        self.assertEqual((2, 1), (c.hits, c.misses))
+        self.assertEqual('%m/%d/%Y', infer.infer(['12/04/2012', '12/13/2012'], cache=c))
+        self.assertEqual(2, c.misses)
+
+    def testFillerText(self):
+        # the first tokens match elements, but too rarely, so they become filler text that the bitmasks do not tell
+        c = cache.FormatCache()
+
+        self.assertEqual('1 x', infer.infer(['1 x', 'x x', 'y x'], cache=c))
+        self.assertEqual('2 x', infer.infer(['2 x', 'x x', 'y x'], cache=c))
+        self.assertEqual('2 x', infer.infer(['2 x', 'x x', 'y x'], cache=c))
+        self.assertEqual((1, 2), (c.hits, c.misses))
+
+    def testAltRules(self):
+        c = cache.FormatCache()
+        alt_rules = [ruleproc.If(ruleproc.Contains(MonthNum), ruleproc.Swap(MonthNum, Hour12))]
+        examples = ['8/12/2004', '8/14/2004']
+
+        self.assertEqual('%m/%d/%Y', infer.infer(examples, cache=c))
+        self.assertEqual('%I/%H/%Y', infer.infer(examples, alt_rules=alt_rules, cache=c))
+        self.assertEqual('%I/%H/%Y', infer.infer(examples, alt_rules=alt_rules, cache=c))
+        self.assertEqual((1, 2, 0, 1024, 2), c.info())
+
+
+class TestInferAll(unittest.TestCase):
+    def testInferAll(self):
+        examples = ['2014-01-11', '2014-01-11 10:00:00', '2013-12-31', '2013-12-31 23:59:59', '1999-07-04',
+                    '7/4/1999', '12/31/2013', '2001-02-28']
+        actual = infer.infer_all(examples)
+
+        self.assertListEqual([('%Y-%m-%d', 0.5), ('%Y-%m-%d %H:%M:%S', 0.25), ('%m/%d/%Y', 0.25)], actual)
+        self.assertEqual('%Y-%m-%d', actual[0].format)
+
+    def testGroupsByShape(self):
+        # month names and abbreviations share a shape, so they are tagged together
+        actual = infer.infer_all(['Jan 5 2014', 'January 5 2014', 'Feb 12 2014', '5.1.2014'])
+
+        self.assertListEqual([('%b %d %Y', 0.75), ('%d.%m.%Y', 0.25)], actual)
+
+    def testEmpty(self):
+        self.assertListEqual([], infer.infer_all([]))
+
+
+class TestInferCandidates(unittest.TestCase):
+    def testDayMonthSwap(self):
+        actual = infer.infer_candidates(['01/02/2014', '03/04/2014'], k=2)
+
+        self.assertListEqual([('%d/%m/%Y', 1.0), ('%m/%d/%Y', 1.0)], actual)
+        self.assertEqual(infer.infer(['01/02/2014', '03/04/2014']), actual[0].format)
+
+    def testFallback(self):
+        # timestamps of a single day: day and month cannot be told apart, so the other order is the runner-up
+        start = datetime.datetime(2014, 1, 1)
+        examples = [(start + datetime.timedelta(minutes=7 * i)).strftime('%Y-%m-%d %H:%M:%S') for i in range(100)]
+        actual = infer.infer_candidates(examples, k=3)
+
+        self.assertEqual(['%Y-%d-%m %H:%M:%S', '%Y-%m-%d %H:%M:%S'], [c.format for c in actual[:2]])
+        self.assertEqual(infer.infer(examples), actual[0].format)
+        self.assertEqual(3, len(actual))
+
+        examples = [(start + datetime.timedelta(minutes=977 * i)).strftime('%Y-%m-%d %H:%M:%S') for i in range(100)]
+        self.assertEqual('%Y-%m-%d %H:%M:%S', infer.infer_candidates(examples)[0].format)
+
+    def testFirstIsInfer(self):
+        for examples in [['2014 x', 'abcd x'], ['abcd x', '2014 x'], ['12/01/2014', 'ab/cd/2014']]:
+            self.assertEqual(infer.infer(examples), infer.infer_candidates(examples)[0].format, examples)
+
+    def testScores(self):
+        examples = ['a 2014-01-13', 'b 2014-02-14', '1 2014-05-05']  # filler scores the fraction of non-dates
+        actual = infer.infer_candidates(examples, k=10)
+
+        self.assertEqual('a %Y-%m-%d', actual[0].format)
+        self.assertAlmostEqual(2.0 / 3, actual[0].score)
+        self.assertEqual(sorted([c.score for c in actual], reverse=True), [c.score for c in actual])
+        self.assertEqual(len(actual), len(set([c.format for c in actual])))
+        self.assertTrue(all([c.format.startswith('a %Y-') for c in actual]))
+
+    def testEmpty(self):
+        self.assertListEqual([('', 1.0)], infer.infer_candidates([]))
+
+
+class TestInferenceState(unittest.TestCase):
+    examples = ['{0:02d}/{1:02d}/2014 {2:02d}:{3:02d} UTC'.format(i % 12 + 1, i % 28 + 1, i % 24, i % 60)
+                for i in range(300)] + ['n/a', '01/02/2014']
+
+    def testMerge(self):
+        shards = [self.examples[:50], self.examples[50:200], self.examples[200:]]
+        states = [state.InferenceState.from_examples(shard) for shard in shards]
+
+        merged = states[0].merge(states[1]).merge(states[2])
+        self.assertEqual(merged, states[2].merge(states[0].merge(states[1])))
+        self.assertEqual(merged, states[0] + states[1] + states[2])
+        whole = state.InferenceState.from_examples(self.examples)
+        self.assertEqual(whole.lengths, merged.lengths)
+        self.assertEqual([masks for masks, tokens in whole.positions[11]],
+                         [masks for masks, tokens in merged.positions[11]])
+        self.assertEqual(infer.infer(self.examples), merged.finalize())
+        self.assertEqual('%m/%d/%Y %H:%M %Z', merged.finalize())
+        self.assertEqual(302, merged.examples)
+        self.assertEqual(50, states[0].examples)  # unchanged
+
+    def testSerialize(self):
+        original = state.InferenceState.from_examples(self.examples)
+        copy = state.InferenceState.from_json(original.to_json())
+
+        self.assertEqual(original, copy)
+        self.assertEqual(original.finalize(), copy.finalize())
+        self.assertLess(len(original.to_json()), 4096)
+
+        d = original.to_dict()
+        d['elements'] = d['elements'][1:]
+        self.assertRaises(ValueError, state.InferenceState.from_dict, d)
+
+    def testFiller(self):
+        examples = ['2014-01-{0:02d} at {1:02d}h'.format(day, day % 24) for day in range(1, 29)]
+        original = state.InferenceState.from_examples(examples, max_tokens=4)
+
+        self.assertEqual('%Y-%m-%d at %Hh', original.finalize())
+        self.assertTrue(all([len(tokens) <= 4 for masks, tokens in original.positions[10]]))
+
+    def testLengthTie(self):
+        examples = ['2014-01-11 10:00', '2014-01-12']
+
+        self.assertEqual('%Y-%d-%m %m:%d', infer.infer(examples))
+        self.assertEqual(infer.infer(examples[1:]), state.InferenceState.from_examples(examples).finalize())
+        self.assertEqual(infer.infer(examples[1:]), state.InferenceState.from_examples(examples[::-1]).finalize())
+
+    def testFillerTie(self):
+        examples = ['b 2014', 'a 2014']
+
+        self.assertEqual('b %Y', infer.infer(examples))
+        self.assertEqual('a %Y', state.InferenceState.from_examples(examples).finalize())
+        self.assertEqual('a %Y', state.InferenceState.from_examples(examples[::-1]).finalize())
+
+    def testLocale(self):
+        french = state.InferenceState.from_examples(['28 janvier 2014', '30 mars 2014'], locale='fr')
+
+        self.assertEqual('%d %B %Y', french.finalize())
+        self.assertRaises(ValueError, french.merge, state.InferenceState())
+        self.assertEqual('', state.InferenceState().finalize())
+
+
+class TestInferenceStats(unittest.TestCase):
+    def testStats(self):
+        examples = ['8/12/2004', '9/13/2005', '11/1/2010 10:00']
+        s = stats.InferenceStats()
+
+        self.assertEqual(infer.infer(examples), infer.infer(examples, stats=s))
+        self.assertEqual(1, s.calls)
+        self.assertEqual(3, s.examples)
+        self.assertEqual(1, s.dropped)
+        self.assertEqual(5, len(s.positions))
+        self.assertEqual({}, s.positions[1])
+        self.assertEqual(1.0, s.positions[4]['%Y'])
+        self.assertEqual(0.5, s.positions[2]['%m'])
+        self.assertGreater(s.total_seconds(), 0.0)
+
+        fired = s.fired_rules(infer.RULES)
+        self.assertEqual(1, len(fired))
+        self.assertIs(infer.RULES[list(s.rules_fired)[0]], fired[0])
+
+    def testAccumulates(self):
+        s = stats.InferenceStats()
+        examples = ['2014-01-11', '2014-11-01']
+        format_cache = cache.FormatCache()
+
+        infer.infer(examples, stats=s, cache=format_cache)
+        infer.infer(examples, stats=s, cache=format_cache)
+        infer.infer(examples, stats=s, validate=True)
+        self.assertEqual(3, s.calls)
+        self.assertEqual(6, s.examples)
+        self.assertEqual(1, s.cache_hits)
+        self.assertEqual(0, s.dropped)
+
+    def testExecuteFired(self):
+        rules = [ruleproc.If(ruleproc.Contains(MonthNum, MonthTextLong), ruleproc.Swap(MonthNum, DayOfMonth)),
+                 ruleproc.If(ruleproc.Duplicate(MonthNum), ruleproc.Swap(MonthNum, DayOfMonth))]
+        fired = []
+
+        ruleproc.compile_rules(rules).execute([MonthNum(), Filler('/'), MonthNum()], fired)
+        self.assertListEqual([1], fired)
+
+
+class TestInferrer(unittest.TestCase):
+    def testMatchesInfer(self):
+        i = inferrer.Inferrer()
+        with open(_EXAMPLES_PATH, 'r') as f:
+            for document in yaml.safe_load_all(f):
+                self.assertEqual(infer.infer(document['examples']), i.infer(document['examples']), document['name'])
+
+    def testInferMany(self):
+        columns = {'a': ['2014-01-11', '2014-11-01', '1990-05-05', '2013-12-13'], 'b': ['12/31/1999', '5/9/1981']}
+        i = inferrer.Inferrer()
+
+        self.assertEqual({'a': '%Y-%m-%d', 'b': '%m/%d/%Y'}, i.infer_many(columns))
+        self.assertListEqual(['%Y-%m-%d', '%m/%d/%Y'], i.infer_many([columns['a'], columns['b']]))
+
+    def testFillerThreshold(self):
+        examples = ['2014-01-21', '2014-11-21', '1990-05-25', '2013-12-x']
+
+        self.assertEqual('%Y-%m-%d', inferrer.Inferrer().infer(examples))
+        self.assertEqual('%Y-%m-21', inferrer.Inferrer(filler_threshold=0.9).infer(examples))
+        self.assertRaises(ValueError, inferrer.Inferrer, filler_threshold=0)
+
+    def testLengthPolicy(self):
+        examples = ['2014-01-11', '2014-11-01', '1990-05-05', '2013-12-13',
+                    '2013-12-13 10:00', '2014-12-24 08:30', '2014-12-25 08:30', '2014-12-26 08:30']
+
+        self.assertEqual('%Y-%m-%d', inferrer.Inferrer(length_policy='mode').infer(examples))
+        self.assertEqual(infer.infer(examples[4:]), inferrer.Inferrer().infer(examples[4:] + examples[:4]))
+        self.assertEqual(infer.infer(examples[4:]), inferrer.Inferrer(length_policy='mode_longest').infer(examples))
+        self.assertRaises(ValueError, inferrer.Inferrer(length_policy='strict').infer, examples)
+        self.assertEqual('%Y-%m-%d', inferrer.Inferrer(length_policy='strict').infer(examples[:4]))
+        self.assertRaises(ValueError, inferrer.Inferrer, length_policy='longest')
+
+    def testElementsAndLocale(self):
+        elements = [MonthNum, DayOfMonth, Year4]
+
+        self.assertEqual('%Y-%m-%d', inferrer.Inferrer(date_elements=elements).infer(['2014-01-11', '2014-11-13']))
+        self.assertEqual('%d %B %Y', inferrer.Inferrer(locale='fr').infer(TestLocales.french))
+
+    def testImmutable(self):
+        i = inferrer.Inferrer()
+
+        self.assertRaises(AttributeError, setattr, i, 'filler_threshold', 0.1)
+        self.assertRaises(AttributeError, setattr, i, 'extra', 1)
+        self.assertRaises(AttributeError, delattr, i, 'rules')
+
+
+class TestLines(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'timestamps.txt')
+        with open(self.path, 'w') as f:
+            for i in range(250):
+                f.write('2014-{0:02d}-{1:02d} {2:02d}:{3:02d}\n\n'.format(i % 12 + 1, i % 28 + 1, i % 24, i % 60))
+            for i in range(150):
+                f.write('{0:02d}/{1:02d}/2014\n'.format(i % 12 + 1, i % 28 + 1))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def run_cli(self, argv, stdin=None):
+        stdin_, stdout = sys.stdin, sys.stdout
+        sys.stdout = output = StringIO()
+        if stdin is not None:
+            sys.stdin = StringIO(stdin)
+        try:
+            status = cli.main(argv)
+        finally:
+            sys.stdin, sys.stdout = stdin_, stdout
+        self.assertEqual(0, status)
+        return output.getvalue()
+
+    def testFile(self):
+        self.assertEqual('%Y-%m-%d %H:%M\n', self.run_cli(['lines', self.path]))
+
+    def testStdin(self):
+        self.assertEqual('%m/%d/%Y\n', self.run_cli(['lines'], stdin='12/31/1999\n01/15/2000\r\n'))
+        self.assertEqual('%m/%d/%Y\n', self.run_cli(['lines', '-'], stdin='12/31/1999\n01/15/2000\n'))
+
+    def testEvery(self):
+        actual = self.run_cli(['lines', '--every', '100', self.path])
+
+        self.assertEqual(['100\t%Y-%m-%d %H:%M', '100\t%Y-%m-%d %H:%M', '100\t%Y-%m-%d %H:%M', '100\t%m/%d/%Y'],
+                         actual.splitlines())
+
+    def testInterval(self):
+        actual = self.run_cli(['lines', '--interval', '3600', self.path])
+
+        self.assertEqual('400\t%Y-%m-%d %H:%M\n', actual)
+
+
+class TestLocales(unittest.TestCase):
+    french = ['3 février 2014', '14 août 2013', '25 décembre 2012', '1 MARS 2011']
+    german = ['Mo, 3. Mär 2014', 'Fr, 14. Feb 2014', 'So, 1. Jun 2014', 'Di, 23. Dez 2014']
+
+    def testInfer(self):
+        self.assertEqual('%d février %Y', infer.infer(self.french))
+        self.assertEqual('%d %B %Y', infer.infer(self.french, locale='fr'))
+        self.assertEqual('%d %B %Y', infer.infer(self.french, locale='fr_CA.UTF-8'))
+        english = ['Mon, 3. Mar 2014', 'Fri, 14. Feb 2014', 'Sun, 1. Jun 2014', 'Tue, 23. Dec 2014']
+        self.assertEqual(infer.infer(english), infer.infer(self.german, locale='de_DE'))
+        self.assertEqual('%d %b. %Y', infer.infer(['3 janv. 2014', '4 févr. 2015'], locale='fr'))
+        self.assertRaises(ValueError, infer.infer, self.french, locale='xx')
+
+    def testValidateAndParse(self):
+        date_string, result = infer.infer(self.french, locale='fr', validate=True)
+
+        self.assertEqual(1.0, result.rate)
+        self.assertEqual(datetime.datetime(2011, 3, 1), parsing.compile_parser(date_string, 'fr').parse('1 MARS 2011'))
+
+    def testStreaming(self):
+        inferrer = streaming.StreamingInferrer(locale='fr')
+        inferrer.update_many(self.french)
+
+        self.assertEqual('%d %B %Y', inferrer.infer())
+
+    def testConcurrent(self):
+        expected = {'fr': infer.infer(self.french, locale='fr'), 'de': infer.infer(self.german, locale='de')}
+        examples = {'fr': self.french, 'de': self.german}
+        failures = []
+
+        def run(locale):
+            for _ in range(50):
+                if infer.infer(examples[locale], locale=locale) != expected[locale]:
+                    failures.append(locale)
+
+        threads = [threading.Thread(target=run, args=(locale,)) for locale in ['fr', 'de'] * 4]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertListEqual([], failures)
+
+    def testRegisterLocale(self):
+        months = ['m{0}'.format(i) for i in range(1, 13)]
+        days = ['d{0}'.format(i) for i in range(1, 8)]
+        locales.register_locale('xx-YY', months, months, days, days)
+        try:
+            self.assertTrue(locales.locale_names('xx_YY.UTF-8').contains('%B', 'M12'))
+            self.assertRaises(ValueError, locales.locale_names, 'xx')
+            self.assertRaises(ValueError, locales.register_locale, 'xx', months[1:], months, days, days)
+        finally:
+            del locales.LOCALE_NAMES['xx_yy']
+
+
+class TestLocate(unittest.TestCase):
+    start = datetime.datetime(2014, 1, 1)
+    words = ['GET', '/index.html', 'user', 'login', 'failed', 'for', 'admin', '200', '404', 'in', '13', 'ms']
+
+    def message(self, i):
+        return ' '.join(self.words[i % 7:i % 7 + 1 + i % 5])
+
+    def testLocate(self):
+        lines = ['{0} INFO {1}'.format((self.start + datetime.timedelta(minutes=977 * i)).strftime(
+            '%Y-%m-%d %H:%M:%S,123'), self.message(i)) for i in range(300)]
+        actual = locate.locate_and_infer(lines)
+
+        self.assertEqual(('%Y-%m-%d %H:%M:%S', 0, 19, 0, 11), actual)
+        self.assertEqual('2014-01-01 16:17:00', lines[1][actual.start:actual.end])
+        self.assertEqual(actual, locate.locate_and_infer([line.encode('ascii') for line in lines]))
+
+    def testPrefix(self):
+        lines = ['127.0.0.{0} - - [{1} -0700] "GET / HTTP/1.0" 200 {2}'.format(
+            i % 256, (self.start + datetime.timedelta(minutes=977 * i)).strftime('%d/%b/%Y:%H:%M:%S'), i * 7)
+            for i in range(300)]
+        actual = locate.locate_and_infer(lines)
+
+        self.assertEqual('%d/%b/%Y:%H:%M:%S %z', actual.format)
+        self.assertEqual((13, 27), (actual.token_start, actual.token_end))
+        # the offsets are those of the most common width of the address, three digits in its last field
+        self.assertEqual((17, 43), (actual.start, actual.end))
+        self.assertEqual('16/May/2014:16:40:00 -0700', lines[200][actual.start:actual.end])
+
+    def testNotFound(self):
+        self.assertIsNone(locate.locate_and_infer([]))
+        self.assertIsNone(locate.locate_and_infer(['connection closed', 'retrying now']))
+
 
 class TestMode(unittest.TestCase):
     def testMode(self):
@@ -71,6 +797,23 @@ class TestMostRestrictive(unittest.TestCase):
         self.assertEqual(Year2(), t([Year4(), Year2()]))
 
 
+class TestPackage(unittest.TestCase):
+    def testLazyImports(self):
+        code = 'import dateinfer, sys; print("asyncio" in sys.modules); dateinfer.AsyncInferrer; ' \
+               'print("asyncio" in sys.modules)'
+        root = os.path.dirname(os.path.dirname(_EXAMPLES_PATH))
+        output = subprocess.check_output([sys.executable, '-c', code], cwd=root)
+        self.assertEqual(['False', 'True'], output.decode().split())
+
+    def testExports(self):
+        import dateinfer
+
+        self.assertIs(asynchronous.infer_async, dateinfer.infer_async)
+        self.assertIs(server.Batcher, dateinfer.Batcher)
+        self.assertIn('make_server', dir(dateinfer))
+        self.assertRaises(AttributeError, getattr, dateinfer, 'no_such_name')
+
+
 class TestPercentMatch(unittest.TestCase):
     def testPercentMatch(self):
         t = infer._percent_match
@@ -98,6 +841,16 @@ class TestRuleElements(unittest.TestCase):
                      Filler(' '), Timezone, Filler(' '), Year4]
         self.assertEqual(3, t([Hour24, Filler(':')], elem_list))
 
+    def testFindAfterMismatch(self):
+        t = ruleproc.Sequence.find
+
+        # the element that ends a partial match does not start a new one (RULES rely on this)
+        self.assertRaises(LookupError, t, [MonthNum, DayOfMonth], [MonthNum(), MonthNum(), DayOfMonth()])
+        self.assertRaises(LookupError, t, [MonthNum, '.', Hour24],
+                          [MonthNum(), Filler('-'), MonthNum(), Filler('T'), Hour24()])
+        self.assertEqual(2, t([MonthNum, '.', Hour24], [Filler('-'), Filler('-'), MonthNum(), Filler('.'), Hour24()]))
+        self.assertRaises(LookupError, t, [MonthNum, DayOfMonth], [DayOfMonth(), MonthNum()])
+
     def testMatch(self):
         t = ruleproc.Sequence.match
 
@@ -122,6 +875,187 @@ class TestRuleElements(unittest.TestCase):
         next3 = ruleproc.Next(Filler, Year4)
         self.assertFalse(next3.is_true(elem_list))
 
+    def testSwapInPlace(self):
+        elem_list = [Hour24(), Filler(':'), Minute(), Filler(' '), Filler('+'), Year4()]
+        swap = ruleproc.Swap(Hour24, Hour12)
+        swap_sequence = ruleproc.SwapSequence([Filler('+'), Year4], [UTCOffset, None])
+
+        self.assertListEqual([Hour12(), Filler(':'), Minute(), Filler(' '), Filler('+'), Year4()],
+                             swap.act(elem_list))
+        swap.apply(elem_list)
+        swap_sequence.apply(elem_list)
+        self.assertListEqual([Hour12(), Filler(':'), Minute(), Filler(' '), UTCOffset()], elem_list)
+
+    def testRequiredDirectives(self):
+        condition = ruleproc.And(ruleproc.Sequence(Hour12, Filler(':'), '\\d', '.'), ruleproc.Duplicate(Hour12()),
+                                 ruleproc.Contains(Hour24))
+
+        self.assertSetEqual(set(['%I', ':', '%H']), condition.required_directives())
+        self.assertSetEqual(set(), ruleproc.ConditionClause().required_directives())
+
+
+class TestSample(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        rng = random.Random(42)
+        cls.examples = ['{0:02d}/{1:02d}/{2} {3:02d}:{4:02d}'.format(rng.randint(1, 28), rng.randint(1, 12),
+                                                                  rng.randint(1980, 2020), rng.randint(0, 23),
+                                                                  rng.randint(0, 59))
+                        for _ in range(50000)]
+
+    def testReservoir(self):
+        result = infer.infer(self.examples, sample='reservoir')
+
+        self.assertEqual('%d/%m/%Y %H:%M', result.format)
+        self.assertLess(result.examined, len(self.examples))
+
+    def testReservoirIterator(self):
+        result = sampling.infer_sample(iter(self.examples), reservoir_size=2000, rng=random.Random(1))
+
+        self.assertEqual('%d/%m/%Y %H:%M', result.format)
+        self.assertLessEqual(result.examined, 2000)
+
+    def testStratified(self):
+        result = sampling.infer_sample(self.examples, method='stratified', rng=random.Random(1))
+
+        self.assertEqual('%d/%m/%Y %H:%M', result.format)
+        self.assertLess(result.examined, len(self.examples))
+
+    def testSmallInput(self):
+        examples = ['8/12/2004', '8/14/2004', '8/16/2004', '8/25/2004']
+
+        self.assertEqual(('%m/%d/%Y', 4), infer.infer(examples, sample='stratified'))
+
+    def testInvalidMethod(self):
+        self.assertRaises(ValueError, infer.infer, self.examples, sample='systematic')
+
+
+class TestServer(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = server.make_server(port=0)
+        cls.url = 'http://127.0.0.1:{0}'.format(cls.server.server_address[1])
+        cls.thread = threading.Thread(target=cls.server.serve_forever)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        cls.server.batcher.close()
+        cls.thread.join()
+
+    def post(self, body):
+        if not isinstance(body, bytes):
+            body = json.dumps(body).encode('utf-8')
+        with urllib.request.urlopen(self.url + '/infer', body) as response:
+            return json.loads(response.read().decode('utf-8'))
+
+    def testExamples(self):
+        actual = self.post({'examples': ['2014-01-13 09:52:52', '2014-01-21 15:30:00']})
+
+        self.assertEqual({'format': '%Y-%m-%d %H:%M:%S'}, actual)
+
+    def testColumns(self):
+        actual = self.post({'columns': {'a': ['12/31/1999', '01/15/2000'], 'b': ['2014-01-13']}})
+        self.assertEqual({'formats': {'a': '%m/%d/%Y', 'b': '%Y-%m-%d'}}, actual)
+
+        actual = self.post({'columns': [['28 janvier 2014', '30 mars 2014'], ['12/31/1999']], 'locale': 'fr'})
+        self.assertEqual({'formats': ['%d %B %Y', '%m/%d/%Y']}, actual)
+
+    def testPlainText(self):
+        actual = self.post(b'12/31/1999\n01/15/2000\n')
+
+        self.assertEqual({'format': '%m/%d/%Y'}, actual)
+
+    def testBadRequest(self):
+        for body in [{'rows': []}, {'examples': ['2014-01-13'], 'locale': 'xx'}, [1, 2]]:
+            with self.assertRaises(urllib.error.HTTPError) as raised:
+                self.post(body)
+            self.assertEqual(400, raised.exception.code)
+            raised.exception.close()
+
+    def testHealth(self):
+        with urllib.request.urlopen(self.url + '/health') as response:
+            actual = json.loads(response.read().decode('utf-8'))
+
+        self.assertEqual('ok', actual['status'])
+
+    def testSocketPath(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'data.txt')
+            with open(path, 'w') as f:
+                f.write('keep me')
+            self.assertRaises(FileExistsError, server.make_server, socket_path=path)
+            self.assertTrue(os.path.isfile(path))
+
+            path = os.path.join(directory, 'dateinfer.sock')
+            for _ in range(2):  # the second server replaces the socket the first one left behind
+                unix_server = server.make_server(socket_path=path)
+                unix_server.server_close()
+                unix_server.batcher.close()
+        finally:
+            shutil.rmtree(directory)
+
+    def testBatcher(self):
+        batcher = server.Batcher(max_batch=8, max_delay=0.05)
+        try:
+            columns = [['2014-01-{0:02d}'.format(day)] for day in range(24, 32)]
+            results = []
+            threads = [threading.Thread(target=lambda c=c: results.append(batcher.submit(c))) for c in columns]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            self.assertEqual(['%Y-%m-%d'] * len(columns), results)
+            self.assertLess(batcher.batches, len(columns))
+            self.assertEqual(1, batcher.cache.info().misses)
+            self.assertRaises(ValueError, batcher.submit, ['2014-01-13'], 'xx')
+        finally:
+            batcher.close()
+
+
+class TestShapeSignature(unittest.TestCase):
+    def testShapeSignature(self):
+        t = infer._shape_signature
+
+        self.assertEqual('', t(''))
+        self.assertEqual('0-0-0 0:0:0', t('2014-01-11 10:00:00'))
+        self.assertEqual('a a 0 0:0:0 a 0', t('Sat Jan  11 19:54:52 MST 2014'))
+        self.assertEqual('0, a', t('12, am'))
+
+
+class TestStreamingInferrer(unittest.TestCase):
+    def testMatchesInfer(self):
+        examples = ['Mon Jan 13 09:52:52 MST 2014', 'Tue Jan 21 15:30:00 EST 2014', '2014-01-11']
+        inferrer = streaming.StreamingInferrer()
+
+        inferrer.update(examples[0])
+        inferrer.update_many(examples[1:])
+
+        self.assertEqual(3, inferrer.examples_seen)
+        self.assertEqual(infer.infer(examples), inferrer.infer())
+        self.assertFalse(inferrer.is_settled())
+
+    def testConsumeStopsEarly(self):
+        examples = itertools.cycle(['2014-01-11', '2013-12-31', '1999-07-04', '2001-02-28', '2010-10-20'])
+        inferrer = streaming.StreamingInferrer()
+
+        consumed = inferrer.consume(examples, chunk_size=50)
+
+        self.assertTrue(inferrer.is_settled())
+        self.assertLess(consumed, 10000)
+        self.assertEqual('%Y-%m-%d', inferrer.infer())
+
+    def testConsumeExhausted(self):
+        inferrer = streaming.StreamingInferrer()
+
+        self.assertEqual(4, inferrer.consume(['8/12/2004', '8/14/2004', '8/16/2004', '8/25/2004']))
+        self.assertFalse(inferrer.is_settled())
+        self.assertEqual('%m/%d/%Y', inferrer.infer())
+
 
 class TestTagMostLikely(unittest.TestCase):
     def testTagMostLikely(self):
@@ -134,6 +1068,46 @@ class TestTagMostLikely(unittest.TestCase):
         self.assertListEqual(actual, expected)
 
 
+class TestTokenClassifier(unittest.TestCase):
+    def testClassify(self):
+        elements = (MonthNum(), DayOfMonth(), Year4(), UTCOffset(), MonthTextShort(), Filler)
+        t = classifier.TokenClassifier(elements).classify
+
+        self.assertEqual(0b100011, t('12'))
+        self.assertEqual(0b100010, t('24'))
+        self.assertEqual(0b101100, t('2014'))
+        self.assertEqual(0b110000, t('Jan'))
+        self.assertEqual(0b100000, t(':'))
+
+    def testClassifyAgreesWithIsMatch(self):
+        t = classifier.TokenClassifier(infer.DATE_ELEMENTS).classify
+
+        for token in ['0', '00', '7', '12', '13', '31', '60', '99', '100', '0400', '2014', '99999', 'am', 'PM',
+                      'May', 'August', 'Mon', 'Tuesday', 'MST', 'US', 'Eastern', 'x', ' ', '-', '\u0663']:
+            expected = 0
+            for index, elem in enumerate(infer.DATE_ELEMENTS):
+                if elem.is_match(token):
+                    expected |= 1 << index
+            self.assertEqual(expected, t(token), token)
+
+    def testRefreshNames(self):
+        c = classifier.TokenClassifier(infer.DATE_ELEMENTS)
+        bit = 1 << infer.DATE_ELEMENTS.index(MonthTextShort())
+
+        self.assertFalse(bit & list(c.mask_counts({'JAN': 1}))[0])
+        try:
+            date_elements.refresh_names(fold_case=True)
+            self.assertTrue(bit & list(c.mask_counts({'JAN': 1}))[0])
+        finally:
+            date_elements.refresh_names()
+        self.assertFalse(bit & list(c.mask_counts({'JAN': 1}))[0])
+
+    def testCount(self):
+        t = classifier.TokenClassifier((DayOfMonth, MonthNum, Filler)).count
+
+        self.assertListEqual([3, 2, 5], t(['1', '2', '24', 'b', 'c']))
+
+
 class TestTokenizeByCharacterClass(unittest.TestCase):
     def testTokenize(self):
         t = infer._tokenize_by_character_class
@@ -143,3 +1117,80 @@ class TestTokenizeByCharacterClass(unittest.TestCase):
         self.assertListEqual(['Sat', ' ', 'Jan', ' ', '11', ' ', '19', ':', '54', ':', '52', ' ', 'MST', ' ', '2014'],
                              t('Sat Jan 11 19:54:52 MST 2014'))
         self.assertListEqual(['4', '/', '30', '/', '1998', ' ', '4', ':', '52', ' ', 'am'], t('4/30/1998 4:52 am'))
+
+    def testTokenizeUnprintable(self):
+        t = infer._tokenize_by_character_class
+
+        self.assertListEqual(['12', '\x00', '\x00', ' ', 'ab'], t('12\x00\x00 ab'))
+
+    def testTokenizeMany(self):
+        t = infer.tokenize_many
+
+        self.assertListEqual([], t([]))
+        self.assertListEqual([['2013', '-', '08', '-', '14'], [], ['4', ':', '52', ' ', 'am']],
+                             t(['2013-08-14', '', '4:52 am']))
+
+    def testTokenizeBytes(self):
+        t = infer.tokenize_many
+
+        self.assertListEqual([[b'2013', b'-', b'08', b'-', b'14'], [b'4', b':', b'52', b' ', b'am']],
+                             t([b'2013-08-14', bytearray(b'4:52 am')]))
+        self.assertListEqual([[b'14', b' ', b'f', u'\xe9'.encode('utf-8'), b'vrier'], [b'30', b' ', b'mars']],
+                             t([u'14 f\xe9vrier'.encode('utf-8'), memoryview(b'30 mars')]))
+        self.assertListEqual([[b'14', b' ', u'f\xe9vrier'.encode('utf-8')]],
+                             t([u'14 f\xe9vrier'.encode('utf-8')], 'fr'))
+
+    def testInferBytes(self):
+        examples = ['Mon Jan 13 09:52:52 UTC 2014', 'Tue Jan 21 15:30:00 GMT 2014', 'Wed Feb 05 11:11:11 UTC 2014']
+        encoded = [example.encode('ascii') for example in examples]
+
+        self.assertEqual(infer.infer(examples), infer.infer(encoded))
+        self.assertEqual(infer.infer(examples), infer.infer([memoryview(example) for example in encoded]))
+        self.assertEqual(1.0, infer.infer([bytearray(example) for example in encoded], validate=True)[1].rate)
+        french = [u'14 f\xe9vrier 2014'.encode('utf-8'), b'30 mars 2014']
+        self.assertEqual('%d %B %Y', infer.infer(french, locale='fr'))
+
+
+class TestValidate(unittest.TestCase):
+    def testIsValidMatchesStrptime(self):
+        parser = parsing.compile_parser('%Y-%m-%d %H:%M:%S')
+        for value in ['2012-02-29 00:00:00', '2013-02-29 00:00:00', '2014-04-31 12:00:00', '2014-04-30 12:00:61',
+                      '2014-04-30 24:00:00', '2014-04-30 23:59:59', '2014-04-30', '0000-01-01 00:00:00',
+                      '0001-01-01 00:00:00']:
+            try:
+                datetime.datetime.strptime(value, parser.format)
+                expected = True
+            except ValueError:
+                expected = False
+            self.assertEqual(expected, parser.is_valid(value), value)
+
+    def testTimezonesMatchStrptime(self):
+        cases = [('%Y-%m-%d %H:%M %z', ['2014-01-11 10:00 +2359', '2014-01-11 10:00 +2400', '2014-01-11 10:00 -9930']),
+                 ('%a %b %d %H:%M:%S %Z %Y', ['Mon Jan 13 09:52:52 UTC 2014', 'Mon Jan 13 09:52:52 gmt 2014',
+                                              'Mon Jan 13 09:52:52 MST 2014', 'Mon Jan 13 09:52:52 XYZ 2014'])]
+        for fmt, values in cases:
+            parser = parsing.compile_parser(fmt)
+            for value in values:
+                try:
+                    datetime.datetime.strptime(value, fmt)
+                    expected = True
+                except ValueError:
+                    expected = False
+                self.assertEqual(expected, parser.is_valid(value), value)
+            self.assertEqual(len([value for value in values if parser.is_valid(value)]),
+                             parsing.validate(values, fmt).matched)
+
+    def testValidate(self):
+        examples = ['2014-01-11', '2014-02-30', '2014/01/05', '2013-12-13'] * 5
+
+        actual = parsing.validate(examples, '%Y-%m-%d', max_failures=3)
+        self.assertEqual(parsing.ValidationResult(0.5, 10, 20, ['2014-02-30', '2014/01/05', '2014-02-30']), actual)
+        self.assertEqual(parsing.ValidationResult(1.0, 0, 0, []), parsing.validate([], '%Y-%m-%d'))
+
+    def testInferValidate(self):
+        examples = ['2014-01-11', '2014-11-01', '1990-05-05', '2013-12-13', '2013-12-13 10:00']
+
+        date_string, result = infer.infer(iter(examples), validate=True)
+        self.assertEqual(infer.infer(examples), date_string)
+        self.assertEqual(0.8, result.rate)
+        self.assertListEqual(['2013-12-13 10:00'], result.failures)
@@ -1,4 +1,4 @@
-from distutils.core import setup
+from setuptools import setup
 
 setup(name='dateinfer',
       version='0.2.0',
@@ -18,5 +18,8 @@ setup(name='dateinfer',
           'Programming Language :: Python :: 3',
           'Topic :: Software Development :: Libraries :: Python Modules',
       ],
-      install_requires=['pytz']
+      install_requires=['pytz'],
+      entry_points={
+          'console_scripts': ['dateinfer = dateinfer.cli:main'],
+      },
       )